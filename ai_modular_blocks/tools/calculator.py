@@ -10,6 +10,10 @@ import re
 from typing import Dict, Any
 
 
+# Compiled once at import; calculate() is called in tight agent loops
+_FUNC_CALL_RE = re.compile(r'[a-zA-Z_][a-zA-Z0-9_]*\s*\(')
+
+
 class Calculator:
     """Simple calculator that evaluates mathematical expressions safely."""
     
@@ -23,6 +27,9 @@ class Calculator:
             "tan": math.tan, "log": math.log, "exp": math.exp,
             "pi": math.pi, "e": math.e
         }
+        self._allowed_re = re.compile(
+            r'^[0-9+\-*/().\s' + ''.join(self.safe_names.keys()) + r']+$'
+        )
     
     def calculate(self, expression: str) -> Dict[str, Any]:
         """
@@ -36,10 +43,9 @@ class Calculator:
         """
         try:
             # Security: only allow safe operations
-            if re.search(r'[a-zA-Z_][a-zA-Z0-9_]*\s*\(', expression):
+            if _FUNC_CALL_RE.search(expression):
                 # Contains function calls, check they're safe
-                allowed_pattern = r'^[0-9+\-*/().\s' + ''.join(self.safe_names.keys()) + r']+$'
-                if not re.match(allowed_pattern, expression.replace(' ', '')):
+                if not self._allowed_re.match(expression.replace(' ', '')):
                     raise ValueError("Unsafe expression")
             
             # Evaluate with safe environment
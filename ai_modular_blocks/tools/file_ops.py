@@ -6,7 +6,7 @@ Pure Python pathlib usage. No framework abstractions.
 
 import asyncio
 from pathlib import Path
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Union
 
 
 class FileOperations:
@@ -31,22 +31,27 @@ class FileOperations:
     async def write_file(
         self, 
         file_path: str, 
-        content: str, 
+        content: Union[str, bytes], 
         encoding: str = "utf-8",
         create_dirs: bool = True
     ) -> Dict[str, Any]:
-        """Write content to a file (async)."""
+        """Write text, or already-encoded bytes, to a file (async)."""
         try:
             path = Path(file_path)
 
             if create_dirs:
-                await asyncio.to_thread(path.parent.mkdir, True, True)
+                await asyncio.to_thread(path.parent.mkdir, parents=True, exist_ok=True)
 
-            await asyncio.to_thread(path.write_text, content, encoding)
+            if isinstance(content, bytes):
+                await asyncio.to_thread(path.write_bytes, content)
+                bytes_written = len(content)
+            else:
+                await asyncio.to_thread(path.write_text, content, encoding)
+                bytes_written = len(content.encode(encoding))
 
             return {
                 "path": str(path),
-                "bytes_written": len(content.encode(encoding)),
+                "bytes_written": bytes_written,
                 "success": True,
             }
 
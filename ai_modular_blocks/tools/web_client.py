@@ -14,10 +14,16 @@ except ImportError:
 
 
 class WebClient:
-    """Simple HTTP client using aiohttp."""
+    """Simple HTTP client using aiohttp.
     
-    def __init__(self, timeout: float = 30.0):
+    Pass an existing ``aiohttp.ClientSession`` to reuse its connection pool
+    across requests; the caller owns it and is responsible for closing it.
+    Without one, each request opens and closes its own session.
+    """
+    
+    def __init__(self, timeout: float = 30.0, session: Optional["aiohttp.ClientSession"] = None):
         self.timeout = timeout
+        self.session = session
         
         if not AIOHTTP_AVAILABLE:
             raise ImportError("aiohttp is required for WebClient. Install with: pip install aiohttp")
@@ -50,43 +56,29 @@ class WebClient:
         try:
             timeout = aiohttp.ClientTimeout(total=self.timeout)
             
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                # Reasonable default headers to avoid 403 from some sites
-                default_headers = {
-                    "User-Agent": (
-                        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
-                        "AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Safari/605.1.15"
-                    ),
-                    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-                    "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
-                    "Connection": "keep-alive",
-                }
-
-                kwargs = {}
-                if data:
-                    kwargs['json'] = data
-                all_headers = default_headers.copy()
-                if headers:
-                    all_headers.update(headers)
-                kwargs['headers'] = all_headers
-                
-                async with session.request(method, url, **kwargs) as response:
-                    response_text = await response.text()
-
-                    # Try to parse as JSON
-                    try:
-                        response_data = await response.json()
-                    except Exception:
-                        response_data = None
+            # Reasonable default headers to avoid 403 from some sites
+            default_headers = {
+                "User-Agent": (
+                    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+                    "AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Safari/605.1.15"
+                ),
+                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+                "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
+                "Connection": "keep-alive",
+            }
 
-                    return {
-                        "status_code": response.status,
-                        "headers": dict(response.headers),
-                        "data": response_data,
-                        "content": response_text,
-                        "url": str(response.url),
-                        "success": 200 <= response.status < 300,
-                    }
+            kwargs = {'timeout': timeout}
+            if data:
+                kwargs['json'] = data
+            all_headers = default_headers.copy()
+            if headers:
+                all_headers.update(headers)
+            kwargs['headers'] = all_headers
+            
+            if self.session is not None:
+                return await self._send(self.session, method, url, kwargs)
+            async with aiohttp.ClientSession(timeout=timeout) as session:
+                return await self._send(session, method, url, kwargs)
                     
         except Exception as e:
             return {
@@ -95,6 +87,32 @@ class WebClient:
                 "method": method,
                 "success": False
             }
+    
+    async def _send(
+        self,
+        session: "aiohttp.ClientSession",
+        method: str,
+        url: str,
+        kwargs: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Send a request on the given session and normalize the response."""
+        async with session.request(method, url, **kwargs) as response:
+            response_text = await response.text()
+
+            # Try to parse as JSON
+            try:
+                response_data = await response.json()
+            except Exception:
+                response_data = None
+
+            return {
+                "status_code": response.status,
+                "headers": dict(response.headers),
+                "data": response_data,
+                "content": response_text,
+                "url": str(response.url),
+                "success": 200 <= response.status < 300,
+            }
 
 
 # Direct usage:
@@ -0,0 +1,9 @@
+"""
+Utilities shared by the examples - small pure-Python helpers, no framework magic.
+
+    from ai_modular_blocks.utils import parse_llm_json
+"""
+
+from .json_utils import parse_llm_json, strip_code_fence
+
+__all__ = ["parse_llm_json", "strip_code_fence"]
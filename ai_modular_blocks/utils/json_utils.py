@@ -0,0 +1,26 @@
+"""
+JSON helpers for LLM replies - Does one thing well: turn a reply into a dict
+
+Pure standard-library json. Models often wrap JSON in a ```json fence; strip it first.
+"""
+
+import json
+import re
+from typing import Any
+
+_FENCE_RE = re.compile(r'\A\s*```(?:json)?\s*(.*?)\s*(?:```\s*)?\Z', re.DOTALL)
+
+
+def strip_code_fence(content: str) -> str:
+    """Remove a surrounding ``` / ```json code fence, if any."""
+    match = _FENCE_RE.match(content)
+    return match.group(1) if match else content.strip()
+
+
+def parse_llm_json(content: str, default: Any = None) -> Any:
+    """Parse a JSON object from an LLM reply; return ``default`` if it is not one."""
+    try:
+        parsed = json.loads(strip_code_fence(content))
+    except ValueError:
+        return default
+    return parsed if isinstance(parsed, dict) else default
@@ -1,9 +1,8 @@
 #!/usr/bin/env python3
 
 import asyncio
+import io
 import os
-import sys
-sys.path.append('../..')
 
 from ai_modular_blocks import create_llm
 from ai_modular_blocks.tools import WebClient
@@ -40,10 +39,12 @@ class WebSearchAssistant:
             return {"error": "没有成功获取任何网页内容"}
         
         # 2. 构造分析提示
-        content_summary = "\n\n".join([
-            f"网页 {i+1}: {result['title']}\nURL: {result['url']}\n内容摘要: {result['content']}"
-            for i, result in enumerate(web_results)
-        ])
+        # content 在获取时已截断，这里直接写入单个缓冲区，避免中间列表
+        buf = io.StringIO()
+        write = buf.write
+        for i, result in enumerate(web_results, 1):
+            write(f"网页 {i}: {result['title']}\nURL: {result['url']}\n内容摘要: {result['content']}\n\n")
+        content_summary = buf.getvalue().rstrip()
         
         prompt = f"""
 基于以下搜索到的网页内容，回答用户问题: {query}
@@ -1,9 +1,8 @@
 #!/usr/bin/env python3
 
 import asyncio
+import io
 import os
-import sys
-sys.path.append('../..')
 
 from ai_modular_blocks import create_llm
 from ai_modular_blocks.tools import FileOperations
@@ -52,10 +51,17 @@ class CodeAnalysisAssistant:
                 total_lines += len(content.split('\n'))
         
         # 3. LLM分析代码库
-        files_summary = "\n\n".join([
-            f"文件: {path}\n```python\n{content[:1000]}{'...' if len(content) > 1000 else ''}\n```"
-            for path, content in file_contents.items()
-        ])
+        buf = io.StringIO()
+        write = buf.write
+        for path, content in file_contents.items():
+            write(f"文件: {path}\n```python\n")
+            if len(content) > 1000:
+                write(content[:1000])
+                write("...")
+            else:
+                write(content)
+            write("\n```\n\n")
+        files_summary = buf.getvalue().rstrip()
         
         analysis_prompt = f"""
 请分析这个Python代码库:
@@ -162,11 +168,19 @@ class DocumentationGenerator:
         if not list_result["success"]:
             return {"error": f"无法访问目录: {list_result['error']}"}
         
-        # 2. 读取关键文件
+        # 2. 读取关键文件（先本地stat过滤不存在的文件，再并发读取）
+        candidates = ['main.py', '__init__.py', 'setup.py', 'pyproject.toml']
+        existing = [
+            name for name in candidates
+            if os.path.isfile(os.path.join(directory, name))
+        ]
+        read_results = await asyncio.gather(*(
+            self.file_ops.read_file(os.path.join(directory, name))
+            for name in existing
+        ))
+
         key_files = {}
-        for filename in ['main.py', '__init__.py', 'setup.py', 'pyproject.toml']:
-            file_path = os.path.join(directory, filename)
-            read_result = await self.file_ops.read_file(file_path)
+        for filename, read_result in zip(existing, read_results):
             if read_result["success"]:
                 key_files[filename] = read_result["content"][:2000]
         
@@ -3,12 +3,14 @@
 import asyncio
 import json
 import os
-import sys
-sys.path.append('../..')
+import re
 
 from ai_modular_blocks import create_llm
 from ai_modular_blocks.tools import Calculator, FileOperations, WebClient
 
+# 需要执行数值分析的研究主题关键词（编译一次，单次扫描匹配）
+_CALC_KEYWORDS_RE = re.compile('|'.join(map(re.escape, ('计算', '数据', '统计'))))
+
 class DataAnalysisWorkflow:
     """
     数据分析工作流 - 协调多个工具完成复杂任务
@@ -103,14 +105,18 @@ class DataAnalysisWorkflow:
             }
         }
         
+        # 每次工作流只序列化一次，后续重试或多模型分发可直接复用
+        collected_json = json.dumps(collected_data, indent=2, ensure_ascii=False)
+        calculations_json = json.dumps(calculations, indent=2, ensure_ascii=False)
+        
         analysis_prompt = f"""
 基于以下财务数据和计算结果，生成一份专业的分析报告:
 
 收集的数据:
-{json.dumps(collected_data, indent=2, ensure_ascii=False)}
+{collected_json}
 
 计算结果:
-{json.dumps(calculations, indent=2, ensure_ascii=False)}
+{calculations_json}
 
 请提供:
 1. 数据概览
@@ -202,7 +208,7 @@ class ResearchPipeline:
         analysis_results = {}
         
         # 模拟一些相关计算
-        if "计算" in topic or "数据" in topic or "统计" in topic:
+        if _CALC_KEYWORDS_RE.search(topic):
             expressions = ["100 / 7", "2.5 * 3.14159", "sqrt(144)"]  # sqrt会失败，展示错误处理
             
             for expr in expressions:
@@ -3,12 +3,40 @@
 import asyncio
 import json
 import os
-import sys
-sys.path.append('../..')
 
-from ai_modular_blocks import create_llm
+from ai_modular_blocks import Message, create_llm
 from ai_modular_blocks.tools import Calculator, FileOperations, WebClient
 
+# 静态的思考指令放在system消息中，每轮保持字节级一致，
+# 便于服务端前缀缓存（prompt caching）命中；只有任务和上下文作为user消息变化
+THINK_SYSTEM_PROMPT = """你是一个智能助手，通过"思考-行动"循环完成用户任务。
+
+可用工具:
+- calculate: 数学计算 (传入表达式字符串)
+- file: 文件操作 (read_file/write_file/list_files)
+- web: 网页获取 (fetch URL内容)
+
+请分析任务，并决定下一步应该:
+1. 使用哪个工具
+2. 传入什么参数
+3. 为什么要这样做
+
+返回格式:
+{
+  "reasoning": "你的分析推理过程",
+  "action": "工具名称",
+  "action_input": "工具参数",
+  "confidence": 0.95
+}
+
+如果任务已经完成，返回:
+{
+  "reasoning": "任务完成的原因",
+  "action": "finished",
+  "final_answer": "最终答案"
+}
+"""
+
 class SimpleReactAgent:
     """
     简单的ReACT代理 (Reason + Act)
@@ -30,38 +58,12 @@ class SimpleReactAgent:
     async def think(self, task: str, context: str = "") -> dict:
         """思考阶段 - 分析任务并决定下一步行动"""
         
-        think_prompt = f"""
-你是一个智能助手，需要完成以下任务: {task}
-
-当前上下文: {context}
-
-可用工具:
-- calculate: 数学计算 (传入表达式字符串)
-- file: 文件操作 (read_file/write_file/list_files)  
-- web: 网页获取 (fetch URL内容)
-
-请分析这个任务，并决定下一步应该:
-1. 使用哪个工具
-2. 传入什么参数
-3. 为什么要这样做
-
-返回格式:
-{{
-  "reasoning": "你的分析推理过程",
-  "action": "工具名称",
-  "action_input": "工具参数",
-  "confidence": 0.95
-}}
-
-如果任务已经完成，返回:
-{{
-  "reasoning": "任务完成的原因",
-  "action": "finished", 
-  "final_answer": "最终答案"
-}}
-"""
+        think_messages = [
+            Message(role="system", content=THINK_SYSTEM_PROMPT),
+            Message(role="user", content=f"需要完成的任务: {task}\n\n当前上下文: {context}"),
+        ]
         
-        response = await self.llm.generate(think_prompt)
+        response = await self.llm.generate(think_messages)
         
         try:
             # 尝试解析JSON响应
@@ -144,7 +146,7 @@ class SimpleReactAgent:
         
         print(f"🤖 开始解决任务: {task}")
         
-        context = ""
+        context_parts: list[str] = []
         history = []
         
         for iteration in range(max_iterations):
@@ -152,7 +154,7 @@ class SimpleReactAgent:
             
             # 思考阶段
             print("🤔 思考中...")
-            decision = await self.think(task, context)
+            decision = await self.think(task, "\n".join(context_parts))
             print(f"💭 推理: {decision.get('reasoning', '无推理过程')}")
             
             history.append({
@@ -182,12 +184,12 @@ class SimpleReactAgent:
             
             history[-1]["action"] = action_result
             
-            # 更新上下文
-            context += f"\n第{iteration+1}轮: 使用{action}工具, 输入{action_input}, "
+            # 更新上下文（追加到列表，避免字符串反复拼接）
             if action_result["success"]:
-                context += f"成功获得结果: {action_result['output']}"
+                outcome = f"成功获得结果: {action_result['output']}"
             else:
-                context += f"失败: {action_result['output']}"
+                outcome = f"失败: {action_result['output']}"
+            context_parts.append(f"第{iteration+1}轮: 使用{action}工具, 输入{action_input}, {outcome}")
         
         # 达到最大迭代次数
         print(f"⏰ 达到最大迭代次数 ({max_iterations})")
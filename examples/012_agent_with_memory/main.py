@@ -1,9 +1,14 @@
 #!/usr/bin/env python3
 
 import asyncio
+import hashlib
 import json
 import os
+import re
 import sys
+import time
+from collections import defaultdict, deque
+from itertools import islice
 from datetime import datetime
 from typing import Dict, List, Any
 
@@ -11,6 +16,64 @@ sys.path.append('../..')
 
 from ai_modular_blocks import create_llm
 from ai_modular_blocks.tools import Calculator, FileOperations
+from ai_modular_blocks.utils import parse_llm_json
+
+# LLM分析结果缓存上限，超出后按插入顺序淘汰最旧的条目
+LLM_CACHE_MAX_ENTRIES = 256
+
+# 短期记忆容量，超出后自动淘汰最旧的条目
+SHORT_TERM_MAX_ITEMS = 50
+
+# 变更日志累计达到该条数后，写一次完整快照并清空日志
+JOURNAL_COMPACT_EVERY = 50
+
+# 长期记忆索引与检索共用的分词正则
+_TOK = re.compile(r'\w+')
+
+# 计算触发条件合并为一个正则（"算"已覆盖"计算"），单次扫描输入。
+# 输入中明显含有算式（数字 运算符 数字）时才需要提取计算表达式；
+# 减号两侧须有空格，避免把日期（2025-10-15）、范围（3-5人）和编号当成减法
+_CALC_TRIGGER_RE = re.compile(r'算|\d\s*[+*/^]\s*\d|\d\s+-\s+\d')
+
+# 需要提取表达式时追加到思考提示末尾，让一次LLM调用同时给出回答和表达式
+CALC_JSON_INSTRUCTION = """
+请以严格JSON返回: {"response": "<你的回答>", "expression": "<需要计算的表达式，比如 25*1.05**5，若无则为NONE>"}
+"""
+
+# 时间戳缓存: [整秒时间戳, 对应的ISO字符串]
+_TS_CACHE = [0, ""]
+
+def _now_iso() -> str:
+    """当前时间的ISO字符串，同一秒内复用已格式化的结果"""
+    now = int(time.time())
+    if _TS_CACHE[0] != now:
+        _TS_CACHE[0] = now
+        _TS_CACHE[1] = datetime.fromtimestamp(now).isoformat()
+    return _TS_CACHE[1]
+
+def _cache_key(*parts: str) -> str:
+    """为一组文本生成稳定的内容哈希键"""
+    return hashlib.blake2b("\x00".join(parts).encode("utf-8"), digest_size=16).hexdigest()
+
+def _atomic_write(file_path: str, data: bytes):
+    """先写临时文件再替换，避免写入中途失败损坏原文件"""
+    tmp_path = file_path + ".tmp"
+    with open(tmp_path, "wb", buffering=65536) as f:
+        f.write(data)
+    os.replace(tmp_path, file_path)
+
+def _append_journal(journal_path: str, data: bytes):
+    """向变更日志末尾追加记录"""
+    with open(journal_path, "ab", buffering=65536) as f:
+        f.write(data)
+
+def _write_snapshot(file_path: str, journal_path: str, data: bytes):
+    """写入完整快照，成功后清空已合并的变更日志"""
+    _atomic_write(file_path, data)
+    try:
+        os.remove(journal_path)
+    except FileNotFoundError:
+        pass
 
 class SimpleMemory:
     """
@@ -20,53 +83,128 @@ class SimpleMemory:
     """
     
     def __init__(self):
-        self.short_term = []  # 短期记忆 - 当前会话
+        self.short_term = deque(maxlen=SHORT_TERM_MAX_ITEMS)  # 短期记忆 - 当前会话
+        # 与short_term按位置对齐的并行环形缓冲，容量相同因此自动保持同步，
+        # 搜索时免去逐条str()/lower()/字典查找
+        self._short_term_lower = deque(maxlen=SHORT_TERM_MAX_ITEMS)
+        self._short_term_types = deque(maxlen=SHORT_TERM_MAX_ITEMS)
+        self._short_term_lines = deque(maxlen=SHORT_TERM_MAX_ITEMS)  # 工作上下文中的展示行
         self.long_term = {}   # 长期记忆 - 持久化存储
         self.working_memory = {}  # 工作记忆 - 当前任务相关
+        self.llm_cache = {}   # LLM分析缓存 - 内容哈希 -> 分析结果，随长期记忆持久化
+        
+        # 长期记忆倒排索引 - 词 -> {(类别, 键)}，检索时无需全量扫描
+        self._token_index = defaultdict(set)
+        self._item_tokens = {}  # (类别, 键) -> 该条目的词集合，覆盖写入时用于清理旧索引
+        
+        # 持久化采用"快照 + 追加日志": 每次只追加新变更，定期合并为快照
+        self._journal = []      # 尚未写入日志文件的变更
+        self._journal_size = 0  # 日志文件中已有的变更条数
     
     def add_short_term(self, memory_type: str, content: Any, metadata: Dict = None):
         """添加短期记忆"""
         memory_item = {
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": _now_iso(),
             "type": memory_type,
             "content": content,
             "metadata": metadata or {}
         }
         self.short_term.append(memory_item)
-        
-        # 限制短期记忆大小
-        if len(self.short_term) > 50:
-            self.short_term = self.short_term[-50:]
+        text = str(content)
+        self._short_term_lower.append(text.lower())
+        self._short_term_types.append(memory_type)
+        self._short_term_lines.append(f"  {memory_type}: {text[:100]}")
+    
+    def recent_short_term(self, n: int = 5) -> List[Dict]:
+        """获取最近的n条短期记忆"""
+        return list(islice(self.short_term, max(0, len(self.short_term) - n), None))
     
     def add_long_term(self, key: str, value: Any, category: str = "general"):
         """添加长期记忆"""
         if category not in self.long_term:
             self.long_term[category] = {}
         
-        self.long_term[category][key] = {
+        item = {
             "value": value,
-            "created": datetime.now().isoformat(),
+            "created": _now_iso(),
             "access_count": 0
         }
+        self.long_term[category][key] = item
+        self._index_long_term(category, key, value)
+        self._journal.append({"op": "put", "cat": category, "key": key, "val": item})
+    
+    def _index_long_term(self, category: str, key: str, value: Any):
+        """将长期记忆条目加入倒排索引"""
+        item = (category, key)
+        for token in self._item_tokens.get(item, ()):
+            self._token_index[token].discard(item)
+        
+        tokens = set(_TOK.findall(f"{key} {value}".lower()))
+        for token in tokens:
+            self._token_index[token].add(item)
+        self._item_tokens[item] = tokens
+    
+    def _rebuild_index(self):
+        """根据当前长期记忆重建倒排索引（一次遍历，每个条目只做一次正则分词）"""
+        token_index = defaultdict(set)
+        item_tokens = {}
+        findall = _TOK.findall
+        for category, items in self.long_term.items():
+            for key, data in items.items():
+                item = (category, key)
+                tokens = set(findall(f"{key} {data['value']}".lower()))
+                for token in tokens:
+                    token_index[token].add(item)
+                item_tokens[item] = tokens
+        self._token_index = token_index
+        self._item_tokens = item_tokens
+    
+    def search_long_term(self, query: str) -> List[tuple]:
+        """按词检索长期记忆，返回 (类别, 键, 记忆数据) 列表"""
+        index = self._token_index
+        # 先与索引词表求交集，只合并命中的倒排列表
+        hits = set(_TOK.findall(query.lower())) & index.keys()
+        candidates = set().union(*(index[token] for token in hits))
+        return [
+            (category, key, self.long_term[category][key])
+            for category, key in candidates
+        ]
     
     def get_long_term(self, key: str, category: str = "general") -> Any:
         """获取长期记忆"""
         if category in self.long_term and key in self.long_term[category]:
             item = self.long_term[category][key]
             item["access_count"] += 1
-            item["last_accessed"] = datetime.now().isoformat()
+            item["last_accessed"] = _now_iso()
+            self._journal.append({"op": "put", "cat": category, "key": key, "val": item})
             return item["value"]
         return None
     
+    def get_cached(self, key: str) -> Any:
+        """读取缓存的LLM分析结果"""
+        return self.llm_cache.get(key)
+    
+    def put_cached(self, key: str, value: Any):
+        """缓存LLM分析结果（FIFO淘汰）"""
+        self._store_cached(key, value)
+        self._journal.append({"op": "cache", "key": key, "val": value})
+    
+    def _store_cached(self, key: str, value: Any):
+        self.llm_cache[key] = value
+        if len(self.llm_cache) > LLM_CACHE_MAX_ENTRIES:
+            del self.llm_cache[next(iter(self.llm_cache))]
+    
     def search_short_term(self, query: str, memory_type: str = None) -> List[Dict]:
         """搜索短期记忆"""
+        q = query.lower()
         results = []
-        for memory in self.short_term:
-            if memory_type and memory["type"] != memory_type:
+        for memory, content_lower, item_type in zip(
+            self.short_term, self._short_term_lower, self._short_term_types
+        ):
+            if memory_type and item_type != memory_type:
                 continue
             
-            content_str = str(memory["content"]).lower()
-            if query.lower() in content_str:
+            if q in content_lower:
                 results.append(memory)
         
         return results[-10:]  # 返回最近的10条匹配记录
@@ -78,38 +216,76 @@ class SimpleMemory:
         # 添加工作记忆
         if self.working_memory:
             context_parts.append("当前任务信息:")
-            for key, value in self.working_memory.items():
-                context_parts.append(f"  {key}: {value}")
+            context_parts.extend(f"  {key}: {value}" for key, value in self.working_memory.items())
         
-        # 添加最近的短期记忆
-        recent_memories = self.short_term[-5:]
-        if recent_memories:
+        # 添加最近的短期记忆（展示行在写入时已格式化好）
+        lines = self._short_term_lines
+        if lines:
             context_parts.append("\n最近的行为:")
-            for memory in recent_memories:
-                context_parts.append(f"  {memory['type']}: {str(memory['content'])[:100]}")
+            context_parts.extend(islice(lines, max(0, len(lines) - 5), None))
         
         return "\n".join(context_parts)
     
-    def save_to_file(self, file_path: str):
-        """保存记忆到文件"""
-        memory_data = {
-            "long_term": self.long_term,
-            "saved_at": datetime.now().isoformat()
-        }
+    async def save_to_file(self, file_path: str):
+        """保存记忆到文件（只追加本次新变更，磁盘I/O放到线程中执行）"""
+        if not self._journal:
+            return
         
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(memory_data, f, ensure_ascii=False, indent=2)
+        journal_path = file_path + ".log"
+        entries, self._journal = self._journal, []
+        self._journal_size += len(entries)
+        
+        # 在事件循环线程中完成序列化，保证写入的是当前时刻的状态
+        if self._journal_size >= JOURNAL_COMPACT_EVERY:
+            memory_data = {
+                "long_term": self.long_term,
+                "llm_cache": self.llm_cache,
+                "saved_at": _now_iso()
+            }
+            data = json.dumps(memory_data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            self._journal_size = 0
+            await asyncio.to_thread(_write_snapshot, file_path, journal_path, data)
+        else:
+            data = "".join(
+                json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n" for entry in entries
+            ).encode("utf-8")
+            await asyncio.to_thread(_append_journal, journal_path, data)
     
     def load_from_file(self, file_path: str):
-        """从文件加载记忆"""
+        """从文件加载记忆（先读快照，再重放变更日志）"""
+        loaded = False
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
                 memory_data = json.load(f)
             
             self.long_term = memory_data.get("long_term", {})
-            return True
+            self.llm_cache = memory_data.get("llm_cache", {})
+            loaded = True
         except FileNotFoundError:
-            return False
+            pass
+        
+        try:
+            with open(file_path + ".log", 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # 跳过写入中断留下的残缺行
+                    self._replay(entry)
+                    self._journal_size += 1
+                    loaded = True
+        except FileNotFoundError:
+            pass
+        
+        self._rebuild_index()
+        return loaded
+    
+    def _replay(self, entry: Dict):
+        """将一条变更日志应用到内存状态"""
+        if entry.get("op") == "put":
+            self.long_term.setdefault(entry["cat"], {})[entry["key"]] = entry["val"]
+        elif entry.get("op") == "cache":
+            self._store_cached(entry["key"], entry["val"])
 
 class MemoryAgent:
     """
@@ -118,8 +294,9 @@ class MemoryAgent:
     展示如何用纯Python为代理添加记忆能力
     """
     
-    def __init__(self, provider: str = "openai", memory_file: str = "agent_memory.json"):
-        self.llm = create_llm(provider, api_key=os.getenv(f"{provider.upper()}_API_KEY"))
+    def __init__(self, provider: str = "openai", memory_file: str = "agent_memory.json", llm=None):
+        # 可传入已有的LLM实例复用其HTTP连接池，避免重复建立TCP/TLS连接
+        self.llm = llm or create_llm(provider, api_key=os.getenv(f"{provider.upper()}_API_KEY"))
         self.memory = SimpleMemory()
         self.memory_file = memory_file
         
@@ -171,15 +348,16 @@ class MemoryAgent:
 """
         
         try:
-            analysis = await self.llm.generate(analysis_prompt)
-            content = analysis["content"].strip()
+            # 相同的交互直接复用之前的分析结果，跳过LLM调用
+            cache_key = _cache_key("remember", user_input, agent_response)
+            decision = self.memory.get_cached(cache_key)
             
-            if content.startswith('```json'):
-                content = content[7:]
-            if content.endswith('```'):
-                content = content[:-3]
-            
-            decision = json.loads(content)
+            if decision is None:
+                analysis = await self.llm.generate(analysis_prompt)
+                decision = parse_llm_json(analysis["content"])
+                if decision is None:
+                    return  # 回复不是JSON对象时不记忆，也不缓存
+                self.memory.put_cached(cache_key, decision)
             
             if decision.get("should_remember"):
                 self.memory.add_long_term(
@@ -189,15 +367,15 @@ class MemoryAgent:
                 )
                 print(f"💾 长期记忆已保存: {decision['key']}")
         
-        except:
+        except Exception:
             pass  # 分析失败不影响主流程
     
-    async def think_with_memory(self, user_input: str) -> str:
-        """结合记忆进行思考"""
+    async def think_with_memory(self, user_input: str, extract_expression: bool = False) -> dict:
+        """结合记忆进行思考，需要时在同一次调用中顺带提取计算表达式"""
         
         # 更新工作记忆
         self.memory.working_memory["current_task"] = user_input
-        self.memory.working_memory["timestamp"] = datetime.now().isoformat()
+        self.memory.working_memory["timestamp"] = _now_iso()
         
         # 搜索相关的历史记忆
         relevant_memories = self.memory.search_short_term(user_input)
@@ -207,11 +385,8 @@ class MemoryAgent:
         
         # 检查是否有相关的长期记忆
         long_term_context = ""
-        for category in self.memory.long_term:
-            for key, data in self.memory.long_term[category].items():
-                if any(word in key.lower() or word in str(data["value"]).lower() 
-                       for word in user_input.lower().split()):
-                    long_term_context += f"\n记住的{category}: {key} = {data['value']}"
+        for category, key, data in self.memory.search_long_term(user_input):
+            long_term_context += f"\n记住的{category}: {key} = {data['value']}"
         
         # 构造思考提示
         think_prompt = f"""
@@ -227,51 +402,70 @@ class MemoryAgent:
 {long_term_context}
 
 相关的历史交互:
-{json.dumps(relevant_memories[-3:], ensure_ascii=False, indent=2) if relevant_memories else '无'}
+{json.dumps(relevant_memories[-3:], ensure_ascii=False, separators=(",", ":")) if relevant_memories else '无'}
 
 基于你的记忆和上下文，请提供有帮助的回答。如果需要使用计算器，请明确说出计算表达式。
 保持你的个性特点，并体现出你记住了之前的交互。
 """
+        if extract_expression:
+            think_prompt += CALC_JSON_INSTRUCTION
         
         response = await self.llm.generate(think_prompt)
-        return response["content"]
+        content = response["content"]
+        if not extract_expression:
+            return {"response": content, "expression": None, "parsed": False}
+        
+        parsed = parse_llm_json(content)
+        if parsed is None:
+            # 解析失败时把原文当作回答，不执行计算；parsed=False 表示结果不可缓存
+            return {"response": content, "expression": "NONE", "parsed": False}
+        return {
+            "response": str(parsed.get("response", "")),
+            "expression": str(parsed.get("expression") or "NONE").strip(),
+            "parsed": True,
+        }
     
     async def process_request(self, user_input: str) -> dict:
         """处理用户请求的完整流程"""
         
         print(f"👤 用户: {user_input}")
         
+        # 简单的工具触发逻辑 (实际应用中可以更智能)
+        needs_calc = _CALC_TRIGGER_RE.search(user_input) is not None
+        
+        # 需要计算时，表达式优先取缓存；未命中则与思考合并为一次LLM调用
+        expression = None
+        cache_key = _cache_key("calc", user_input)
+        if needs_calc:
+            expression = self.memory.get_cached(cache_key)
+        
         # 结合记忆思考
-        response = await self.think_with_memory(user_input)
+        thought = await self.think_with_memory(
+            user_input, extract_expression=needs_calc and expression is None
+        )
+        response = thought["response"]
         print(f"🤖 {self.personality['name']}: {response}")
         
+        if needs_calc and expression is None:
+            expression = thought["expression"]
+            # 只缓存确实从回复中解析出的表达式，避免一次解析失败永久关闭该输入的计算
+            if thought["parsed"]:
+                self.memory.put_cached(cache_key, expression)
+        
         # 检查是否需要执行工具操作
         action_taken = None
         
-        # 简单的工具触发逻辑 (实际应用中可以更智能)
-        if "计算" in user_input or "算" in user_input:
-            # 提取计算表达式
-            calc_prompt = f"""
-从以下文本中提取需要计算的数学表达式: {user_input}
-
-只返回一个可以直接计算的表达式，比如: 25*1.05**5
-如果没有明确的计算需求，返回: NONE
-"""
-            
-            calc_analysis = await self.llm.generate(calc_prompt)
-            expression = calc_analysis["content"].strip()
-            
-            if expression != "NONE" and expression:
-                calc_result = self.calculator.calculate(expression)
-                if calc_result["success"]:
-                    action_taken = f"计算: {expression} = {calc_result['result']}"
-                    response += f"\n\n📊 计算结果: {expression} = {calc_result['result']}"
+        if needs_calc and expression and expression != "NONE":
+            calc_result = self.calculator.calculate(expression)
+            if calc_result["success"]:
+                action_taken = f"计算: {expression} = {calc_result['result']}"
+                response += f"\n\n📊 计算结果: {expression} = {calc_result['result']}"
         
         # 记住这次交互
         await self.remember_interaction(user_input, response, action_taken)
         
         # 保存记忆
-        self.memory.save_to_file(self.memory_file)
+        await self.memory.save_to_file(self.memory_file)
         
         return {
             "user_input": user_input,
@@ -289,7 +483,7 @@ class MemoryAgent:
             "working_memory": self.memory.working_memory,
             "recent_interactions": [
                 f"{m['type']}: {str(m['content'])[:50]}..."
-                for m in self.memory.short_term[-5:]
+                for m in self.memory.recent_short_term(5)
             ]
         }
 
@@ -334,7 +528,7 @@ async def main():
     
     # 演示记忆持久化 - 重启代理
     print(f"\n🔄 重启代理，测试记忆持久化...")
-    new_agent = MemoryAgent("openai", "demo_memory.json")
+    new_agent = MemoryAgent("openai", "demo_memory.json", llm=agent.llm)
     
     restart_result = await new_agent.process_request("你还记得我是谁吗？我们之前讨论过什么？")
     print(f"重启后的记忆测试完成！")
@@ -3,79 +3,178 @@
 import asyncio
 import json
 import os
+import re
 import sys
-from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from types import MappingProxyType
+from typing import Dict, List, Any, Mapping, Optional
 
 sys.path.append('../..')
 
 from ai_modular_blocks import create_llm
 from ai_modular_blocks.tools import Calculator, FileOperations
+from ai_modular_blocks.utils import strip_code_fence
+
+# 文件操作关键词，编译一次、单次扫描即可区分读/写（忽略大小写，无需先lower）
+_FILE_OP_RE = re.compile(r'(读取|read)|(写入|write)', re.IGNORECASE)
+
+# 任务动作分析缓存上限，超出后按插入顺序淘汰最旧的条目
+ACTION_CACHE_MAX_ENTRIES = 256
+
+# 同时进行的任务分析LLM调用上限，避免触发服务端限流
+MAX_CONCURRENT_TASKS = 8
+
+# 时间戳缓存: [整秒时间戳, 对应的ISO字符串]
+_TS_CACHE = [0, ""]
+
+def _now_iso() -> str:
+    """当前时间的ISO字符串，同一秒内复用已格式化的结果"""
+    now = int(time.time())
+    if _TS_CACHE[0] != now:
+        _TS_CACHE[0] = now
+        _TS_CACHE[1] = datetime.fromtimestamp(now).isoformat()
+    return _TS_CACHE[1]
+
+def _format_ts(ts: float) -> Optional[str]:
+    """把 time.time() 时间戳格式化为ISO字符串，0.0 视为未设置"""
+    return datetime.fromtimestamp(ts).isoformat() if ts else None
 
 class TaskPlan:
-    """任务计划 - 纯Python数据结构"""
+    """任务计划 - 纯Python数据结构
+    
+    to_dict() 的结果按节点缓存，只在节点被修改后重建。因此修改只能通过方法和
+    属性赋值进行，它们会置脏标记: add_subtask、add_dependency、set_metadata、
+    estimated_time 赋值以及 start/complete/fail。subtasks、dependencies 以元组、
+    metadata 以只读映射对外暴露；name、description、priority 在创建后不再修改。
+    """
+    
+    __slots__ = (
+        "name", "description", "priority", "status", "_subtasks", "_dependencies",
+        "_estimated_time", "actual_time", "created_at", "started_at", "completed_at",
+        "_started_mono", "result", "_metadata", "_dict_cache", "_dirty",
+    )
     
     def __init__(self, name: str, description: str, priority: int = 1):
+        # to_dict() 的缓存结果，由修改节点的方法置脏标记
+        self._dict_cache = None
+        self._dirty = True
         self.name = name
         self.description = description
         self.priority = priority  # 1-5, 5最重要
         self.status = "pending"  # pending, in_progress, completed, failed
-        self.subtasks = []
-        self.dependencies = []
-        self.estimated_time = None
+        self._subtasks = ()
+        self._dependencies = ()
+        self._estimated_time = None
         self.actual_time = None
-        self.created_at = datetime.now()
-        self.started_at = None
-        self.completed_at = None
+        # 时间点以 time.time() 浮点数保存，0.0 表示尚未发生，只在 to_dict 时格式化
+        self.created_at = time.time()
+        self.started_at = 0.0
+        self.completed_at = 0.0
+        self._started_mono = None  # 单调时钟起点，仅用于计算耗时
         self.result = None
-        self.metadata = {}
+        self._metadata = {}
+    
+    @property
+    def subtasks(self) -> tuple:
+        """子任务（只读），通过 add_subtask 添加"""
+        return self._subtasks
+    
+    @property
+    def dependencies(self) -> tuple:
+        """依赖的任务名（只读），通过 add_dependency 添加"""
+        return self._dependencies
+    
+    @property
+    def metadata(self) -> Mapping[str, Any]:
+        """附加信息（只读映射），通过 set_metadata 修改"""
+        return MappingProxyType(self._metadata)
+    
+    @property
+    def estimated_time(self) -> Optional[float]:
+        """预估耗时（秒）"""
+        return self._estimated_time
+    
+    @estimated_time.setter
+    def estimated_time(self, seconds: Optional[float]):
+        self._estimated_time = seconds
+        self._dirty = True
     
     def add_subtask(self, subtask: 'TaskPlan'):
         """添加子任务"""
-        self.subtasks.append(subtask)
+        self._subtasks += (subtask,)
+        self._dirty = True
     
     def add_dependency(self, dependency: str):
         """添加依赖任务"""
-        self.dependencies.append(dependency)
+        self._dependencies += (dependency,)
+        self._dirty = True
+    
+    def set_metadata(self, key: str, value: Any):
+        """设置一项附加信息"""
+        self._metadata[key] = value
+        self._dirty = True
     
     def start(self):
         """开始执行任务"""
         self.status = "in_progress"
-        self.started_at = datetime.now()
+        self.started_at = time.time()
+        self._started_mono = time.monotonic()
+        self._dirty = True
     
     def complete(self, result: Any = None):
         """完成任务"""
         self.status = "completed"
-        self.completed_at = datetime.now()
+        self.completed_at = time.time()
         self.result = result
         
-        if self.started_at:
-            duration = self.completed_at - self.started_at
-            self.actual_time = duration.total_seconds()
+        if self._started_mono is not None:
+            self.actual_time = time.monotonic() - self._started_mono
+        self._dirty = True
     
     def fail(self, error: str):
         """任务失败"""
         self.status = "failed"
         self.result = {"error": error}
-        self.completed_at = datetime.now()
+        self.completed_at = time.time()
+        self._dirty = True
     
     def to_dict(self) -> Dict:
-        """转换为字典格式"""
-        return {
+        """转换为字典格式
+        
+        返回顶层字典的浅拷贝；嵌套的子任务字典与缓存共享，只能读取不要修改
+        """
+        return dict(self._cached_dict())
+    
+    def _cached_dict(self) -> Dict:
+        """返回缓存的字典，未修改的节点直接复用上次的结果"""
+        subtask_dicts = [st._cached_dict() for st in self._subtasks]
+        cached = self._dict_cache
+        if (
+            cached is not None
+            and not self._dirty
+            and all(new is old for new, old in zip(subtask_dicts, cached["subtasks"]))
+        ):
+            return cached
+        
+        self._dict_cache = {
             "name": self.name,
             "description": self.description,
             "priority": self.priority,
             "status": self.status,
-            "subtasks": [st.to_dict() for st in self.subtasks],
-            "dependencies": self.dependencies,
-            "estimated_time": self.estimated_time,
+            "subtasks": subtask_dicts,
+            "dependencies": list(self._dependencies),
+            "estimated_time": self._estimated_time,
             "actual_time": self.actual_time,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "started_at": self.started_at.isoformat() if self.started_at else None,
-            "completed_at": self.completed_at.isoformat() if self.completed_at else None,
+            "created_at": _format_ts(self.created_at),
+            "started_at": _format_ts(self.started_at),
+            "completed_at": _format_ts(self.completed_at),
             "result": self.result,
-            "metadata": self.metadata
+            "metadata": dict(self._metadata)
         }
+        self._dirty = False
+        return self._dict_cache
 
 class PlanningAgent:
     """
@@ -92,6 +191,8 @@ class PlanningAgent:
         # 计划管理
         self.active_plans = {}  # plan_id -> TaskPlan
         self.execution_history = []
+        self._action_cache = {}  # (名称, 描述, 工具) -> LLM解析出的动作
+        self._llm_semaphore = asyncio.Semaphore(MAX_CONCURRENT_TASKS)
         
         # 代理能力
         self.capabilities = [
@@ -153,13 +254,7 @@ class PlanningAgent:
         
         try:
             # 解析计划JSON
-            content = response["content"].strip()
-            if content.startswith('```json'):
-                content = content[7:]
-            if content.endswith('```'):
-                content = content[:-3]
-            
-            plan_data = json.loads(content)
+            plan_data = json.loads(strip_code_fence(response["content"]))
             
             # 创建主计划
             main_plan = TaskPlan(
@@ -179,7 +274,7 @@ class PlanningAgent:
                     priority=subtask_data["priority"]
                 )
                 subtask.estimated_time = subtask_data.get("estimated_time", 0) * 60
-                subtask.metadata["tools_needed"] = subtask_data.get("tools_needed", [])
+                subtask.set_metadata("tools_needed", subtask_data.get("tools_needed", []))
                 
                 main_plan.add_subtask(subtask)
                 subtask_map[subtask.name] = subtask
@@ -193,7 +288,7 @@ class PlanningAgent:
             # 保存计划
             plan_id = f"plan_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
             self.active_plans[plan_id] = main_plan
-            main_plan.metadata["plan_id"] = plan_id
+            main_plan.set_metadata("plan_id", plan_id)
             
             print(f"📋 计划创建完成 (ID: {plan_id})")
             print(f"   主任务: {main_plan.name}")
@@ -223,31 +318,37 @@ class PlanningAgent:
         failed_tasks = 0
         
         try:
-            # 按依赖关系排序子任务
-            sorted_subtasks = self._sort_by_dependencies(plan.subtasks)
-            
-            for subtask in sorted_subtasks:
-                print(f"\n📌 执行子任务: {subtask.name}")
-                subtask.start()
+            # 按依赖关系分批，同一批次内互不依赖的子任务并发执行
+            for wave in self._dependency_waves(plan.subtasks):
+                for subtask in wave:
+                    print(f"\n📌 执行子任务: {subtask.name}")
+                    subtask.start()
                 
                 # 执行子任务
-                task_result = await self._execute_single_task(subtask)
-                
-                if task_result["success"]:
-                    subtask.complete(task_result["result"])
-                    successful_tasks += 1
-                    print(f"   ✅ 完成: {task_result.get('message', 'OK')}")
-                else:
-                    subtask.fail(task_result["error"])
-                    failed_tasks += 1
-                    print(f"   ❌ 失败: {task_result['error']}")
+                wave_results = await asyncio.gather(
+                    *(self._execute_single_task(subtask) for subtask in wave),
+                    return_exceptions=True
+                )
                 
-                execution_log.append({
-                    "task": subtask.name,
-                    "success": task_result["success"],
-                    "result": task_result,
-                    "duration": subtask.actual_time
-                })
+                for subtask, task_result in zip(wave, wave_results):
+                    if isinstance(task_result, Exception):
+                        task_result = {"success": False, "error": f"任务执行失败: {task_result}"}
+                    
+                    if task_result["success"]:
+                        subtask.complete(task_result["result"])
+                        successful_tasks += 1
+                        print(f"   ✅ {subtask.name} 完成: {task_result.get('message', 'OK')}")
+                    else:
+                        subtask.fail(task_result["error"])
+                        failed_tasks += 1
+                        print(f"   ❌ {subtask.name} 失败: {task_result['error']}")
+                    
+                    execution_log.append({
+                        "task": subtask.name,
+                        "success": task_result["success"],
+                        "result": task_result,
+                        "duration": subtask.actual_time
+                    })
             
             # 完成主计划
             plan_success = failed_tasks == 0
@@ -283,29 +384,55 @@ class PlanningAgent:
     
     def _sort_by_dependencies(self, tasks: List[TaskPlan]) -> List[TaskPlan]:
         """根据依赖关系排序任务"""
-        sorted_tasks = []
-        remaining = tasks.copy()
+        return [task for wave in self._dependency_waves(tasks) for task in wave]
+    
+    def _dependency_waves(self, tasks: List[TaskPlan]) -> List[List[TaskPlan]]:
+        """按依赖关系把任务分成若干批次（Kahn拓扑排序逐层推进）
+        
+        同一批次内的任务互不依赖，可以并发执行；批次内按优先级从高到低排列
+        """
+        names = {task.name for task in tasks}
+        in_degree = [0] * len(tasks)
+        dependents = defaultdict(list)  # 任务名 -> 依赖它的任务下标
+        for i, task in enumerate(tasks):
+            for dep in task.dependencies:
+                if dep in names:
+                    in_degree[i] += 1
+                    dependents[dep].append(i)
+        
+        # 预先算出每个任务的优先级名次（优先级高在前，同级保持原顺序），
+        # 之后的批内排序和打破循环只比较整数，不再逐次构造元组、读取属性
+        rank = [0] * len(tasks)
+        for position, i in enumerate(sorted(range(len(tasks)), key=lambda j: (-tasks[j].priority, j))):
+            rank[i] = position
+        
+        waves = []
+        pending = set(range(len(tasks)))  # 尚未分批的任务下标
         completed_names = set()
+        wave = [i for i in range(len(tasks)) if in_degree[i] == 0]
         
-        while remaining:
-            # 找到没有未满足依赖的任务
-            ready_tasks = []
-            for task in remaining:
-                deps_satisfied = all(dep in completed_names for dep in task.dependencies)
-                if deps_satisfied:
-                    ready_tasks.append(task)
+        while pending:
+            if not wave:
+                # 没有可执行的任务，存在循环依赖，取剩余任务中优先级最高的打破循环
+                wave = [min(pending, key=rank.__getitem__)]
             
-            if not ready_tasks:
-                # 如果没有可执行的任务，可能存在循环依赖，按优先级排序
-                ready_tasks = sorted(remaining, key=lambda t: t.priority, reverse=True)[:1]
+            wave.sort(key=rank.__getitem__)
+            waves.append([tasks[i] for i in wave])
+            pending.difference_update(wave)
             
-            # 添加到执行队列
-            for task in ready_tasks:
-                sorted_tasks.append(task)
-                completed_names.add(task.name)
-                remaining.remove(task)
+            next_wave = []
+            for i in wave:
+                name = tasks[i].name
+                if name in completed_names:
+                    continue
+                completed_names.add(name)
+                for j in dependents.get(name, ()):
+                    in_degree[j] -= 1
+                    if in_degree[j] == 0 and j in pending:
+                        next_wave.append(j)
+            wave = next_wave
         
-        return sorted_tasks
+        return waves
     
     async def _execute_single_task(self, task: TaskPlan) -> Dict:
         """执行单个任务"""
@@ -333,15 +460,18 @@ class PlanningAgent:
 """
         
         try:
-            response = await self.llm.generate(execution_prompt)
-            content = response["content"].strip()
+            # 相同的任务定义复用之前的动作分析，跳过LLM调用
+            cache_key = (task.name, task.description, tuple(tools_needed))
+            action = self._action_cache.get(cache_key)
             
-            if content.startswith('```json'):
-                content = content[7:]
-            if content.endswith('```'):
-                content = content[:-3]
+            if action is None:
+                async with self._llm_semaphore:
+                    response = await self.llm.generate(execution_prompt)
+                action = json.loads(strip_code_fence(response["content"]))
+                self._action_cache[cache_key] = action
+                if len(self._action_cache) > ACTION_CACHE_MAX_ENTRIES:
+                    del self._action_cache[next(iter(self._action_cache))]
             
-            action = json.loads(content)
             action_type = action.get("action_type", "other")
             action_details = action.get("action_details", "")
             
@@ -362,14 +492,15 @@ class PlanningAgent:
             
             elif action_type == "file" and "file_ops" in tools_needed:
                 # 简单的文件操作示例
-                if "读取" in action_details or "read" in action_details.lower():
+                file_op = _FILE_OP_RE.search(action_details)
+                if file_op and file_op.group(1):
                     # 模拟文件读取
                     return {
                         "success": True,
                         "result": "文件内容示例",
                         "message": "文件读取成功"
                     }
-                elif "写入" in action_details or "write" in action_details.lower():
+                elif file_op:
                     # 模拟文件写入
                     return {
                         "success": True,
@@ -398,20 +529,16 @@ class PlanningAgent:
         
         plan_data = {
             "plan": plan.to_dict(),
-            "saved_at": datetime.now().isoformat()
+            "saved_at": _now_iso()
         }
         
-        await self.file_ops.write_file(filename, json.dumps(plan_data, ensure_ascii=False, indent=2))
+        await self.file_ops.write_file(filename, json.dumps(plan_data, ensure_ascii=False, separators=(",", ":")))
         print(f"💾 计划已保存到: {filename}")
     
     def get_plan_status(self, plan: TaskPlan) -> Dict:
         """获取计划状态摘要"""
-        subtasks_by_status = {}
-        for subtask in plan.subtasks:
-            status = subtask.status
-            if status not in subtasks_by_status:
-                subtasks_by_status[status] = 0
-            subtasks_by_status[status] += 1
+        # Counter在C层完成计数，避免逐个判断键是否存在
+        subtasks_by_status = dict(Counter(subtask.status for subtask in plan.subtasks))
         
         return {
             "plan_name": plan.name,
@@ -420,7 +547,7 @@ class PlanningAgent:
             "subtasks_by_status": subtasks_by_status,
             "estimated_time": f"{plan.estimated_time/60:.1f} 分钟" if plan.estimated_time else "未估计",
             "actual_time": f"{plan.actual_time/60:.1f} 分钟" if plan.actual_time else "未完成",
-            "created_at": plan.created_at.strftime("%Y-%m-%d %H:%M:%S")
+            "created_at": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(plan.created_at))
         }
 
 async def main():
@@ -2,15 +2,220 @@
 
 import asyncio
 import json
+import math
 import os
+import re
 import sys
-from datetime import datetime
-from typing import Dict, List, Any
+import time
+from collections import Counter, OrderedDict, defaultdict, deque
+from itertools import islice
+from typing import Callable, Dict, List, Optional
 
 sys.path.append('../..')
 
 from ai_modular_blocks import create_llm
 from ai_modular_blocks.tools import Calculator, FileOperations
+from ai_modular_blocks.utils import parse_llm_json
+
+try:
+    # 可选依赖: 句向量模型 + 向量化相似度计算，未安装时回退到纯Python的字符二元组向量
+    import numpy as np
+    from sentence_transformers import SentenceTransformer
+except ImportError:
+    np = None
+    SentenceTransformer = None
+
+# 从任务文本中提取数字
+_NUM_RE = re.compile(r'\d+(?:\.\d+)?')
+
+# 计算类任务的关键词，编译为一个正则单次扫描
+_CALC_TASK_RE = re.compile('计算|数学')
+
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+SEMANTIC_CACHE_THRESHOLD = 0.87  # 句向量余弦相似度达到该值即视为同一提示（针对MiniLM调校）
+BIGRAM_CACHE_THRESHOLD = 0.95  # 字符二元组向量区分度低，无模型时需要更严格的阈值
+SEMANTIC_CACHE_MAX_ENTRIES = 512  # 每个命名空间的条目上限，超出后淘汰最久未使用的
+
+MAX_CONCURRENT_TASKS = 4  # 批量执行时同时进行的任务数，受LLM服务商的并发限制约束
+
+# 提示模板的缓存命名空间
+_TPL_OPTIMIZE = "optimize_v1"
+_TPL_EXECUTE = "execute_v1"
+_TPL_REFLECT = "reflect_v1"
+_TPL_FUSED = "fused_v1"
+
+# 缓存执行结果的命名空间只做精确匹配: 相似的任务（如不同数字的同类计算）答案并不相同
+_EXACT_NAMESPACES = frozenset({_TPL_EXECUTE, _TPL_FUSED})
+
+# 反思结果中的列表字段，模型漏掉时补为空列表
+_REFLECTION_LIST_KEYS = ("what_went_well", "what_could_improve", "key_learnings", "optimization_suggestions")
+
+# 各类学习记录的容量上限，超出后自动淘汰最旧的条目
+PERFORMANCE_LOG_MAX = 1000
+IMPROVEMENT_HISTORY_MAX = 200
+SUCCESS_PATTERNS_MAX = 20
+LONGTERM_PATTERNS_MAX = 100  # 长期层按命中次数（LFU）淘汰
+PATTERN_PROMOTE_EVERY = 50   # 每学习这么多个任务，把短期层中命中最多的模式提升到长期层
+PATTERN_PROMOTE_TOP_K = 5
+KNOWLEDGE_BASE_MAX = 50
+
+def _bigram_vector(text: str) -> Dict[str, float]:
+    """字符二元组词袋向量（L2归一化），作为无模型时的简易语义表示"""
+    text = text.lower()
+    counts = Counter(text[i:i + 2] for i in range(len(text) - 1)) or Counter(text)
+    norm = math.sqrt(sum(c * c for c in counts.values())) or 1.0
+    return {gram: c / norm for gram, c in counts.items()}
+
+def _sparse_dot(a: Dict[str, float], b: Dict[str, float]) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(w * b.get(gram, 0.0) for gram, w in a.items())
+
+def _normalize_reflection(reflection: Dict) -> Dict:
+    """补齐反思结果的字段: 评分转为整数（无法转换时取5），缺失或非列表的字段规整为列表"""
+    normalized = dict(reflection)
+    try:
+        normalized["performance_rating"] = int(float(reflection.get("performance_rating", 5)))
+    except (TypeError, ValueError):
+        normalized["performance_rating"] = 5
+    for key in _REFLECTION_LIST_KEYS:
+        value = reflection.get(key)
+        if not isinstance(value, list):
+            normalized[key] = [] if value is None else [value]
+    return normalized
+
+def _parse_fused_reply(content: str) -> Optional[Dict]:
+    """解析合并调用的回复，缺少策略或反思评分时返回None"""
+    fused = parse_llm_json(content)
+    if fused is None or "strategy" not in fused:
+        return None
+    reflection = fused.get("reflection")
+    if not isinstance(reflection, dict) or "performance_rating" not in reflection:
+        return None
+    return fused
+
+def _tail(items: deque, n: int) -> list:
+    """取队列末尾的n个元素"""
+    return list(islice(items, max(0, len(items) - n), None))
+
+class _SemanticCache:
+    """
+    语义提示缓存 - 措辞几乎相同的提示直接复用之前的LLM响应
+    
+    每个调用点（提示模板）使用独立的命名空间，避免不同模板之间互相命中；
+    相似度基于模板中变化的部分计算，固定的模板文字不会稀释差异。
+    _EXACT_NAMESPACES 中的命名空间（缓存的是执行结果）只按原文精确命中
+    """
+    
+    def __init__(self, threshold: Optional[float] = None,
+                 max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES):
+        if threshold is None:
+            threshold = SEMANTIC_CACHE_THRESHOLD if SentenceTransformer is not None else BIGRAM_CACHE_THRESHOLD
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._entries: Dict[str, OrderedDict] = {}  # 命名空间 -> {键文本: (向量, 响应)}
+        # 命名空间 -> (预分配的float32向量矩阵, 行号 -> 键文本, 键文本 -> 行号)，仅句向量路径使用；
+        # 条目始终占据前len(entries)行，淘汰腾出的行立即由新条目复用
+        self._matrices: Dict[str, tuple] = {}
+        self._model = None
+        # 键文本 -> 向量（LRU），查询后写入、并发任务交错查询的向量都可直接复用
+        self._embeddings: OrderedDict = OrderedDict()
+    
+    def _encoder(self):
+        if self._model is None:
+            self._model = SentenceTransformer(EMBEDDING_MODEL)
+        return self._model
+    
+    def _remember(self, text: str, vec):
+        self._embeddings[text] = vec
+        if len(self._embeddings) > self.max_entries:
+            self._embeddings.popitem(last=False)
+    
+    def _embed(self, text: str):
+        vec = self._embeddings.get(text)
+        if vec is not None:
+            self._embeddings.move_to_end(text)
+            return vec
+        if SentenceTransformer is not None:
+            vec = self._encoder().encode(text, normalize_embeddings=True)
+        else:
+            vec = _bigram_vector(text)
+        self._remember(text, vec)
+        return vec
+    
+    def _nearest(self, namespace: str, query) -> tuple:
+        """返回 (最相似的键文本, 相似度)"""
+        entries = self._entries[namespace]
+        if SentenceTransformer is not None:
+            # 向量已归一化，点积即余弦相似度
+            matrix, keys_by_row, _ = self._matrices[namespace]
+            sims = matrix[:len(entries)] @ query
+            best = int(np.argmax(sims))
+            return keys_by_row[best], float(sims[best])
+        
+        best_key, best_sim = None, -1.0
+        for key, (vec, _) in entries.items():
+            sim = _sparse_dot(query, vec)
+            if sim > best_sim:
+                best_key, best_sim = key, sim
+        return best_key, best_sim
+    
+    def get(self, namespace: str, text: str) -> Optional[Dict]:
+        """查找语义相近的已缓存响应，未命中返回None"""
+        entries = self._entries.get(namespace)
+        if not entries:
+            return None
+        
+        # 精确匹配快速路径: 直接以变化部分的原始字符串查字典（str自身缓存哈希，无需编码或摘要），
+        # 命中时无需计算向量
+        hit = entries.get(text)
+        if hit is not None:
+            entries.move_to_end(text)
+            return hit[1]
+        if namespace in _EXACT_NAMESPACES:
+            return None
+        
+        key, sim = self._nearest(namespace, self._embed(text))
+        if sim < self.threshold:
+            return None
+        entries.move_to_end(key)
+        return entries[key][1]
+    
+    def put(self, namespace: str, text: str, response: Dict):
+        """写入缓存（LRU淘汰）"""
+        entries = self._entries.setdefault(namespace, OrderedDict())
+        if namespace in _EXACT_NAMESPACES:
+            # 精确匹配的命名空间不参与相似度比较，无需计算向量
+            entries[text] = (None, response)
+            entries.move_to_end(text)
+            if len(entries) > self.max_entries:
+                entries.popitem(last=False)
+            return
+        vec = self._embed(text)
+        if SentenceTransformer is not None:
+            self._store_row(namespace, entries, text, vec)
+        entries[text] = (vec, response)
+        entries.move_to_end(text)
+        if len(entries) > self.max_entries:
+            entries.popitem(last=False)
+    
+    def _store_row(self, namespace: str, entries: OrderedDict, text: str, vec):
+        """把向量写入命名空间的预分配矩阵；已满时先淘汰最久未使用的条目并复用其行"""
+        if namespace not in self._matrices:
+            matrix = np.empty((self.max_entries, len(vec)), dtype=np.float32)
+            self._matrices[namespace] = (matrix, [None] * self.max_entries, {})
+        matrix, keys_by_row, row_by_key = self._matrices[namespace]
+        
+        row = row_by_key.get(text)
+        if row is None:
+            if len(entries) >= self.max_entries:
+                evicted, _ = entries.popitem(last=False)
+                row = row_by_key.pop(evicted)
+            else:
+                row = len(entries)
+            row_by_key[text] = row
+            keys_by_row[row] = text
+        matrix[row] = vec
 
 class SelfImprovingAgent:
     """
@@ -25,22 +230,56 @@ class SelfImprovingAgent:
         self.file_ops = FileOperations()
         
         # 性能跟踪
-        self.performance_log = []
-        self.learned_patterns = {}
-        self.improvement_history = []
+        self.performance_log = deque(maxlen=PERFORMANCE_LOG_MAX)
+        # 成功模式分两层: 短期层按先进先出滚动，经常被检索命中的模式提升到长期层长期保留
+        self.learned_patterns = {
+            "successful": deque(maxlen=SUCCESS_PATTERNS_MAX),
+            "longterm": {}  # 模式序号 -> 模式
+        }
+        self.improvement_history = deque(maxlen=IMPROVEMENT_HISTORY_MAX)
+        self._rating_total = 0  # performance_log 中评分之和，随写入/淘汰增量维护
+        
+        # 成功模式的关键词倒排索引 - 关键词 -> {模式序号}，检索时无需逐条扫描
+        self._kw_index: Dict[str, set] = defaultdict(set)
+        self._patterns_by_seq: Dict[int, Dict] = {}  # 模式序号 -> 模式（两层都包含）
+        self._mtm_seqs = deque(maxlen=SUCCESS_PATTERNS_MAX)  # 与短期层按位置对齐的模式序号
+        self._pattern_hits: Counter = Counter()  # 模式序号 -> 被检索命中的次数
+        self._pattern_seq = 0
+        self._tasks_learned = 0
         
         # 知识库
         self.knowledge_base = {
-            "successful_strategies": [],
-            "common_mistakes": [],
-            "optimization_tips": []
+            "successful_strategies": deque(maxlen=KNOWLEDGE_BASE_MAX),
+            "common_mistakes": deque(maxlen=KNOWLEDGE_BASE_MAX),
+            "optimization_tips": deque(maxlen=KNOWLEDGE_BASE_MAX)
         }
+        # 各类别当前已收录条目的集合，用于插入时O(1)去重
+        self._knowledge_seen = {category: set() for category in self.knowledge_base}
+        
+        # 语义提示缓存 - 相似任务的优化/执行/反思直接复用之前的响应
+        self._prompt_cache = _SemanticCache()
+    
+    async def _cached_generate(self, prompt: str, namespace: str, key: str = None,
+                               accept: Optional[Callable[[Dict], bool]] = None) -> Dict:
+        """先查语义缓存，未命中再请求LLM
+        
+        key 为提示模板中变化的部分（默认整个提示），用于相似度比较；
+        传入 accept 时只缓存它认可的响应，无法使用的回复不会被反复命中
+        """
+        key = prompt if key is None else key
+        cached = self._prompt_cache.get(namespace, key)
+        if cached is not None:
+            return cached
+        response = await self.llm.generate(prompt)
+        if accept is None or accept(response):
+            self._prompt_cache.put(namespace, key, response)
+        return response
     
     async def execute_task_with_reflection(self, task: str) -> Dict:
         """执行任务并进行反思改进"""
         
         print(f"🎯 执行任务: {task}")
-        start_time = datetime.now()
+        start_time = time.perf_counter()
         
         # 1. 基于历史经验优化任务执行
         optimized_approach = await self._optimize_approach(task)
@@ -50,8 +289,7 @@ class SelfImprovingAgent:
         result = await self._execute_with_monitoring(task, optimized_approach)
         
         # 3. 性能反思
-        end_time = datetime.now()
-        execution_time = (end_time - start_time).total_seconds()
+        execution_time = time.perf_counter() - start_time
         
         reflection = await self._reflect_on_performance(task, result, execution_time)
         
@@ -66,18 +304,112 @@ class SelfImprovingAgent:
             "improvements_learned": len(self.improvement_history)
         }
     
+    async def execute_batch(self, tasks: List[str], max_concurrency: int = MAX_CONCURRENT_TASKS) -> List[Dict]:
+        """批量执行任务 - 每个任务一次合并调用，任务之间有界并发"""
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def run(task: str) -> Dict:
+            async with semaphore:
+                return await self._execute_fused(task)
+        
+        return await asyncio.gather(*(run(task) for task in tasks))
+    
+    async def _execute_fused(self, task: str) -> Dict:
+        """用一次LLM调用同时完成策略、执行和反思，解析失败时回退到三次调用的流程"""
+        
+        start_time = time.perf_counter()
+        
+        context = self._similar_patterns_context(task)
+        fused_prompt = f"""
+任务: {task}
+{context}
+
+请基于历史经验制定执行策略，完成任务，并反思这次执行的表现。
+
+返回JSON:
+{{
+  "strategy": "具体策略描述",
+  "result": "执行结果和详细过程",
+  "reflection": {{
+    "performance_rating": 8,
+    "what_went_well": ["优点1", "优点2"],
+    "what_could_improve": ["改进点1", "改进点2"],
+    "key_learnings": ["学习点1", "学习点2"],
+    "optimization_suggestions": ["建议1", "建议2"]
+  }}
+}}
+"""
+        
+        response = await self._cached_generate(
+            fused_prompt, _TPL_FUSED, f"{task}\n{context}",
+            accept=lambda r: _parse_fused_reply(r["content"]) is not None
+        )
+        
+        fused = _parse_fused_reply(response["content"])
+        if fused is None:
+            return await self.execute_task_with_reflection(task)
+        strategy = fused["strategy"]
+        reflection = _normalize_reflection(fused["reflection"])
+        
+        print(f"🎯 执行任务: {task}")
+        print(f"💡 优化策略: {strategy}")
+        result = {
+            "success": True,
+            "result": str(fused.get("result", ""))[:500],
+            "method": "LLM分析",
+            "details": "通过语言模型一次完成策略、执行与反思"
+        }
+        execution_time = time.perf_counter() - start_time
+        
+        self._record_performance(task, reflection, execution_time)
+        await self._learn_from_experience(task, result, reflection)
+        
+        return {
+            "task": task,
+            "result": result,
+            "execution_time": execution_time,
+            "reflection": reflection,
+            "improvements_learned": len(self.improvement_history)
+        }
+    
+    def _similar_patterns_context(self, task: str) -> str:
+        """查找相似任务的成功策略，生成提示中的历史经验部分"""
+        index = self._kw_index
+        hit_seqs = set().union(*(index[token] for token in set(task.lower().split()) if token in index))
+        if not hit_seqs:
+            return ""
+        self._pattern_hits.update(hit_seqs)
+        
+        # 长期层中命中最多的优先，其次是短期层中最近的
+        longterm = self.learned_patterns["longterm"]
+        ltm_hits = sorted((seq for seq in hit_seqs if seq in longterm),
+                          key=self._pattern_hits.__getitem__, reverse=True)
+        mtm_hits = sorted((seq for seq in hit_seqs if seq not in longterm), reverse=True)
+        similar_patterns = [self._patterns_by_seq[seq] for seq in (ltm_hits + mtm_hits)[:3]]
+        
+        patterns_json = json.dumps(similar_patterns, ensure_ascii=False, separators=(",", ":"))
+        
+        return f"历史成功策略: {patterns_json}"
+    
+    def _record_performance(self, task: str, reflection: Dict, execution_time: float):
+        """记录一次任务的性能评分"""
+        rating = reflection.get("performance_rating", 5)
+        if len(self.performance_log) == self.performance_log.maxlen:
+            self._rating_total -= self.performance_log[0]["rating"]
+        self._rating_total += rating
+        # 时间戳存为纳秒整数，需要展示时再用 datetime.fromtimestamp(ts / 1e9) 格式化
+        self.performance_log.append({
+            "task": task,
+            "rating": rating,
+            "execution_time": execution_time,
+            "timestamp": time.time_ns()
+        })
+    
     async def _optimize_approach(self, task: str) -> Dict:
         """基于历史经验优化执行方法"""
         
         # 查找相似任务的成功策略
-        similar_patterns = []
-        for pattern in self.learned_patterns.get("successful", []):
-            if any(keyword in task.lower() for keyword in pattern.get("keywords", [])):
-                similar_patterns.append(pattern)
-        
-        context = ""
-        if similar_patterns:
-            context = f"历史成功策略: {json.dumps(similar_patterns[-3:], ensure_ascii=False)}"
+        context = self._similar_patterns_context(task)
         
         optimization_prompt = f"""
 任务: {task}
@@ -94,36 +426,27 @@ class SelfImprovingAgent:
 }}
 """
         
-        response = await self.llm.generate(optimization_prompt)
+        response = await self._cached_generate(optimization_prompt, _TPL_OPTIMIZE, f"{task}\n{context}")
         
-        try:
-            content = response["content"].strip()
-            if content.startswith('```json'):
-                content = content[7:]
-            if content.endswith('```'):
-                content = content[:-3]
-            return json.loads(content)
-        except:
-            return {
-                "strategy": "标准执行流程",
-                "key_steps": ["分析任务", "执行操作", "验证结果"],
-                "potential_risks": ["执行失败"],
-                "success_metrics": ["任务完成"]
-            }
+        return parse_llm_json(response["content"], {
+            "strategy": "标准执行流程",
+            "key_steps": ["分析任务", "执行操作", "验证结果"],
+            "potential_risks": ["执行失败"],
+            "success_metrics": ["任务完成"]
+        })
     
     async def _execute_with_monitoring(self, task: str, approach: Dict) -> Dict:
         """执行任务并监控性能"""
         
         try:
             # 简化的任务执行逻辑
-            if "计算" in task or "数学" in task:
+            if _CALC_TASK_RE.search(task):
                 # 提取并执行数学计算
                 calc_prompt = f"从任务中提取数学表达式: {task}"
                 calc_response = await self.llm.generate(calc_prompt)
                 
                 # 简单提取逻辑
-                import re
-                numbers = re.findall(r'\d+(?:\.\d+)?', task)
+                numbers = _NUM_RE.findall(task)
                 if len(numbers) >= 2:
                     expr = f"{numbers[0]} + {numbers[1]}"  # 简化示例
                     calc_result = self.calculator.calculate(expr)
@@ -143,7 +466,9 @@ class SelfImprovingAgent:
 请提供执行结果和详细过程。
 """
             
-            response = await self.llm.generate(execution_prompt)
+            response = await self._cached_generate(
+                execution_prompt, _TPL_EXECUTE, f"{task}\n{approach['strategy']}"
+            )
             
             return {
                 "success": True,
@@ -163,9 +488,11 @@ class SelfImprovingAgent:
     async def _reflect_on_performance(self, task: str, result: Dict, execution_time: float) -> Dict:
         """反思任务执行的性能"""
         
+        # 只序列化一次，同时用于提示和语义缓存的键
+        result_json = json.dumps(result, ensure_ascii=False, separators=(",", ":"))
         reflection_prompt = f"""
 刚才执行了任务: {task}
-执行结果: {json.dumps(result, ensure_ascii=False)}
+执行结果: {result_json}
 执行时间: {execution_time:.2f}秒
 
 请反思这次执行的表现:
@@ -180,37 +507,28 @@ class SelfImprovingAgent:
 }}
 """
         
-        response = await self.llm.generate(reflection_prompt)
+        response = await self._cached_generate(reflection_prompt, _TPL_REFLECT, f"{task}\n{result_json}")
         
-        try:
-            content = response["content"].strip()
-            if content.startswith('```json'):
-                content = content[7:]
-            if content.endswith('```'):
-                content = content[:-3]
-            reflection = json.loads(content)
-            
+        reflection = parse_llm_json(response["content"])
+        if reflection is not None:
+            reflection = _normalize_reflection(reflection)
             # 记录性能
-            self.performance_log.append({
-                "task": task,
-                "rating": reflection.get("performance_rating", 5),
-                "execution_time": execution_time,
-                "timestamp": datetime.now().isoformat()
-            })
-            
+            self._record_performance(task, reflection, execution_time)
             return reflection
-            
-        except:
-            return {
-                "performance_rating": 5,
-                "what_went_well": ["任务完成"],
-                "what_could_improve": ["提高效率"],
-                "key_learnings": ["积累经验"],
-                "optimization_suggestions": ["优化流程"]
-            }
+        
+        return {
+            "performance_rating": 5,
+            "what_went_well": ["任务完成"],
+            "what_could_improve": ["提高效率"],
+            "key_learnings": ["积累经验"],
+            "optimization_suggestions": ["优化流程"]
+        }
     
     async def _learn_from_experience(self, task: str, result: Dict, reflection: Dict):
-        """从经验中学习"""
+        """从经验中学习
+        
+        方法体内没有await，在事件循环中一次执行完毕，并发任务不会交错修改共享的模式与知识库
+        """
         
         # 提取任务关键词
         task_keywords = task.lower().split()[:5]
@@ -222,16 +540,27 @@ class SelfImprovingAgent:
                 "keywords": task_keywords,
                 "strategy": result.get("method", "unknown"),
                 "success_factors": reflection.get("what_went_well", []),
-                "timestamp": datetime.now().isoformat()
+                "timestamp": time.time_ns()
             }
             
-            if "successful" not in self.learned_patterns:
-                self.learned_patterns["successful"] = []
-            self.learned_patterns["successful"].append(success_pattern)
-            
-            # 限制存储数量
-            if len(self.learned_patterns["successful"]) > 20:
-                self.learned_patterns["successful"] = self.learned_patterns["successful"][-20:]
+            patterns = self.learned_patterns["successful"]
+            # 短期层已满时append会挤掉最旧的模式: 被命中过的提升到长期层，从未命中的移出索引
+            if len(patterns) == patterns.maxlen:
+                oldest = self._mtm_seqs[0]
+                if self._pattern_hits[oldest]:
+                    self._promote_pattern(oldest)
+                else:
+                    self._unindex_pattern(oldest)
+            patterns.append(success_pattern)
+            self._mtm_seqs.append(self._index_pattern(success_pattern))
+        
+        # 定期把短期层中命中最多的模式提升到长期层
+        self._tasks_learned += 1
+        if self._tasks_learned % PATTERN_PROMOTE_EVERY == 0:
+            hot = [seq for seq in self._mtm_seqs if self._pattern_hits[seq]]
+            hot.sort(key=self._pattern_hits.__getitem__, reverse=True)
+            for seq in hot[:PATTERN_PROMOTE_TOP_K]:
+                self._promote_pattern(seq)
         
         # 记录改进建议
         improvements = reflection.get("optimization_suggestions", [])
@@ -239,44 +568,85 @@ class SelfImprovingAgent:
             self.improvement_history.append({
                 "task": task,
                 "improvements": improvements,
-                "timestamp": datetime.now().isoformat()
+                "timestamp": time.time_ns()
             })
         
         # 更新知识库
-        self.knowledge_base["successful_strategies"].extend(
-            reflection.get("what_went_well", [])
-        )
-        self.knowledge_base["optimization_tips"].extend(
-            reflection.get("optimization_suggestions", [])
-        )
+        self._add_knowledge("successful_strategies", reflection.get("what_went_well", []))
+        self._add_knowledge("optimization_tips", reflection.get("optimization_suggestions", []))
+    
+    def _add_knowledge(self, category: str, items: List[str]):
+        """向知识库追加条目，跳过已收录的相同条目（LLM经常重复返回同样的表述）"""
+        entries = self.knowledge_base[category]
+        seen = self._knowledge_seen[category]
+        for item in items:
+            item = str(item).strip()
+            if not item or item in seen:
+                continue
+            # 队列已满时append会自动淘汰最旧的条目，同步移出集合
+            if len(entries) == entries.maxlen:
+                seen.discard(entries[0])
+            entries.append(item)
+            seen.add(item)
+    
+    def _index_pattern(self, pattern: Dict) -> int:
+        """将成功模式的关键词加入倒排索引（关键词插入时已小写），返回模式序号"""
+        seq = self._pattern_seq
+        self._pattern_seq += 1
+        self._patterns_by_seq[seq] = pattern
+        for keyword in pattern["keywords"]:
+            self._kw_index[keyword].add(seq)
+        return seq
+    
+    def _unindex_pattern(self, seq: int):
+        """从倒排索引中移除模式，若仍在短期层中一并移除"""
+        if seq in self._mtm_seqs:
+            position = self._mtm_seqs.index(seq)
+            del self._mtm_seqs[position]
+            del self.learned_patterns["successful"][position]
+        pattern = self._patterns_by_seq.pop(seq)
+        self._pattern_hits.pop(seq, None)
+        for keyword in pattern["keywords"]:
+            seqs = self._kw_index[keyword]
+            seqs.discard(seq)
+            if not seqs:
+                del self._kw_index[keyword]
+    
+    def _promote_pattern(self, seq: int):
+        """把模式从短期层移到长期层，长期层满时淘汰命中次数最少的模式"""
+        position = self._mtm_seqs.index(seq)
+        del self._mtm_seqs[position]
+        del self.learned_patterns["successful"][position]
         
-        # 限制知识库大小
-        for category in self.knowledge_base:
-            if len(self.knowledge_base[category]) > 50:
-                self.knowledge_base[category] = self.knowledge_base[category][-50:]
+        longterm = self.learned_patterns["longterm"]
+        longterm[seq] = self._patterns_by_seq[seq]
+        if len(longterm) > LONGTERM_PATTERNS_MAX:
+            victim = min(longterm, key=self._pattern_hits.__getitem__)
+            del longterm[victim]
+            self._unindex_pattern(victim)
     
     def get_improvement_summary(self) -> Dict:
         """获取自我改进的摘要"""
         
-        # 计算平均性能评分
-        ratings = [log["rating"] for log in self.performance_log]
-        avg_rating = sum(ratings) / len(ratings) if ratings else 0
+        # 计算平均性能评分（总和已增量维护，无需遍历整个日志）
+        total_tasks = len(self.performance_log)
+        avg_rating = self._rating_total / total_tasks if total_tasks else 0
         
         # 最近的改进趋势
-        recent_ratings = ratings[-10:] if len(ratings) >= 10 else ratings
+        recent_ratings = [log["rating"] for log in _tail(self.performance_log, 10)]
         recent_avg = sum(recent_ratings) / len(recent_ratings) if recent_ratings else 0
         
         return {
-            "total_tasks": len(self.performance_log),
+            "total_tasks": total_tasks,
             "average_performance": round(avg_rating, 2),
             "recent_performance": round(recent_avg, 2),
             "improvement_trend": "上升" if recent_avg > avg_rating else "稳定",
-            "learned_patterns": len(self.learned_patterns.get("successful", [])),
+            "learned_patterns": len(self._patterns_by_seq),
             "knowledge_base_size": {
                 category: len(items) for category, items in self.knowledge_base.items()
             },
-            "top_strategies": self.knowledge_base["successful_strategies"][-5:],
-            "recent_optimizations": [h["improvements"] for h in self.improvement_history[-3:]]
+            "top_strategies": _tail(self.knowledge_base["successful_strategies"], 5),
+            "recent_optimizations": [h["improvements"] for h in _tail(self.improvement_history, 3)]
         }
 
 async def main():
@@ -297,11 +667,11 @@ async def main():
     
     print("开始执行任务序列，观察代理的自我改进...\n")
     
-    for i, task in enumerate(tasks, 1):
+    # 每个任务一次合并的LLM调用，各任务有界并发执行
+    results = await agent.execute_batch(tasks)
+    
+    for i, result in enumerate(results, 1):
         print(f"--- 任务 {i} ---")
-        
-        result = await agent.execute_task_with_reflection(task)
-        
         print(f"执行时间: {result['execution_time']:.2f}秒")
         print(f"性能评分: {result['reflection']['performance_rating']}/10")
         print(f"成功因素: {result['reflection']['what_went_well']}")
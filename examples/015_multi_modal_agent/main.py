@@ -3,13 +3,33 @@
 import asyncio
 import json
 import os
+import re
 import sys
-from typing import Dict, List, Any, Union
+from collections import OrderedDict
+from typing import AsyncIterator, Callable, Dict, List, Optional, Union
 
 sys.path.append('../..')
 
 from ai_modular_blocks import create_llm
 from ai_modular_blocks.tools import Calculator, FileOperations, WebClient
+from ai_modular_blocks.utils import parse_llm_json
+
+try:
+    import aiohttp  # WebClient的依赖，用于在整个演示中共享一个连接池
+except ImportError:
+    aiohttp = None
+
+# 从输入文本中提取URL
+_URL_RE = re.compile(r'https?://[^\s]+')
+
+# 文件读取类请求的关键词（忽略大小写，无需先lower）
+_FILE_READ_RE = re.compile('读取|read', re.IGNORECASE)
+
+# 支持的模态类型，与 MultiModalAgent.processors 的键一致
+_PROCESSOR_KEYS = frozenset({"text", "calculation", "file", "web", "data"})
+
+# 输入理解结果缓存上限，超出后淘汰最久未使用的条目
+UNDERSTANDING_CACHE_MAX_ENTRIES = 256
 
 class MultiModalAgent:
     """
@@ -18,13 +38,14 @@ class MultiModalAgent:
     纯Python实现，展示如何优雅地处理不同类型的任务
     """
     
-    def __init__(self, provider: str = "openai"):
+    def __init__(self, provider: str = "openai", http_session=None):
         self.llm = create_llm(provider, api_key=os.getenv(f"{provider.upper()}_API_KEY"))
         self.calculator = Calculator()
         self.file_ops = FileOperations()
-        self.web_client = WebClient()
+        # 传入共享的 aiohttp.ClientSession 时，所有网页请求复用同一个连接池
+        self.web_client = WebClient(session=http_session)
         
-        # 模态处理器
+        # 模态处理器（分发表，键为 _PROCESSOR_KEYS）
         self.processors = {
             "text": self._process_text,
             "calculation": self._process_calculation,
@@ -32,6 +53,9 @@ class MultiModalAgent:
             "web": self._process_web,
             "data": self._process_data
         }
+        
+        # 输入理解缓存 - 完全相同的分析提示直接复用之前的LLM响应
+        self._understanding_cache = OrderedDict()
     
     async def understand_input(self, user_input: str, context: Dict = None) -> Dict:
         """理解输入的类型和意图"""
@@ -40,7 +64,7 @@ class MultiModalAgent:
 分析以下用户输入的类型和处理方式:
 
 输入: {user_input}
-上下文: {json.dumps(context or {}, ensure_ascii=False)}
+上下文: {json.dumps(context or {}, ensure_ascii=False, separators=(",", ":"))}
 
 请判断这个输入需要什么类型的处理:
 
@@ -54,54 +78,84 @@ class MultiModalAgent:
 }}
 """
         
-        response = await self.llm.generate(analysis_prompt)
-        
-        try:
-            content = response["content"].strip()
-            if content.startswith('```json'):
-                content = content[7:]
-            if content.endswith('```'):
-                content = content[:-3]
-            
-            return json.loads(content)
-        except:
-            return {
-                "primary_type": "text",
-                "secondary_types": [],
-                "intent": "通用文本处理",
-                "required_tools": ["llm"],
-                "processing_strategy": "语言模型分析"
-            }
+        response = self._understanding_cache.get(analysis_prompt)
+        if response is None:
+            response = await self.llm.generate(analysis_prompt)
+            self._understanding_cache[analysis_prompt] = response
+            if len(self._understanding_cache) > UNDERSTANDING_CACHE_MAX_ENTRIES:
+                self._understanding_cache.popitem(last=False)
+        else:
+            self._understanding_cache.move_to_end(analysis_prompt)
+        
+        return parse_llm_json(response["content"], {
+            "primary_type": "text",
+            "secondary_types": [],
+            "intent": "通用文本处理",
+            "required_tools": ["llm"],
+            "processing_strategy": "语言模型分析"
+        })
     
-    async def process_multi_modal_input(self, user_input: str, context: Dict = None) -> Dict:
-        """处理多模态输入"""
+    async def process_multi_modal_input(
+        self,
+        user_input: str,
+        context: Dict = None,
+        on_token: Optional[Callable[[str], None]] = None
+    ) -> Dict:
+        """处理多模态输入
+        
+        传入 on_token 时流式生成最终回答，每收到一段文本就回调一次；
+        未传入时，单个可直接作答的结果跳过综合这一次LLM调用
+        """
         
         print(f"🔍 分析输入: {user_input}")
         
         # 1. 理解输入类型
         understanding = await self.understand_input(user_input, context)
-        print(f"📊 识别类型: {understanding['primary_type']}")
+        print(f"📊 识别类型: {understanding.get('primary_type')}")
         print(f"🎯 处理意图: {understanding['intent']}")
         
-        # 2. 执行主要处理
-        primary_result = await self.processors[understanding["primary_type"]](
-            user_input, understanding
+        # 2. 主要处理和辅助处理互不依赖，并发执行
+        primary_type = understanding.get("primary_type")
+        if primary_type not in _PROCESSOR_KEYS:
+            primary_type = "text"  # LLM返回了未知类型时按纯文本处理
+        # dict.fromkeys 去重并保持顺序，同一辅助类型只处理一次
+        secondary_types = [
+            sec_type for sec_type in dict.fromkeys(understanding.get("secondary_types", []))
+            if sec_type in _PROCESSOR_KEYS and sec_type != primary_type
+        ]
+        results = await asyncio.gather(
+            self.processors[primary_type](user_input, understanding),
+            *(self.processors[sec_type](user_input, understanding) for sec_type in secondary_types),
+            return_exceptions=True
         )
         
-        # 3. 执行辅助处理
+        primary_result = results[0]
+        if isinstance(primary_result, Exception):
+            raise primary_result
+        
+        # 3. 整理辅助处理结果，单个辅助处理失败不影响整体
         secondary_results = []
-        for sec_type in understanding.get("secondary_types", []):
-            if sec_type in self.processors and sec_type != understanding["primary_type"]:
-                sec_result = await self.processors[sec_type](user_input, understanding)
-                secondary_results.append({
-                    "type": sec_type,
-                    "result": sec_result
-                })
+        for sec_type, sec_result in zip(secondary_types, results[1:]):
+            if isinstance(sec_result, Exception):
+                sec_result = {"success": False, "error": str(sec_result)}
+            secondary_results.append({
+                "type": sec_type,
+                "result": sec_result
+            })
         
         # 4. 综合结果
-        final_result = await self._synthesize_results(
-            user_input, primary_result, secondary_results, understanding
-        )
+        if on_token is None:
+            final_result = await self._synthesize_results(
+                user_input, primary_result, secondary_results, understanding
+            )
+        else:
+            chunks = []
+            async for chunk in self._synthesize_results_stream(
+                user_input, primary_result, secondary_results, understanding
+            ):
+                on_token(chunk)
+                chunks.append(chunk)
+            final_result = "".join(chunks)
         
         return {
             "input": user_input,
@@ -167,7 +221,7 @@ class MultiModalAgent:
         """处理文件操作"""
         
         # 简化的文件操作处理
-        if "读取" in input_text or "read" in input_text.lower():
+        if _FILE_READ_RE.search(input_text):
             # 提取文件路径的简单逻辑
             words = input_text.split()
             potential_files = [w for w in words if '.' in w and '/' not in w[:3]]
@@ -194,8 +248,7 @@ class MultiModalAgent:
         """处理网页相关请求"""
         
         # 提取URL的简单逻辑
-        import re
-        urls = re.findall(r'https?://[^\s]+', input_text)
+        urls = _URL_RE.findall(input_text)
         
         if urls:
             url = urls[0]
@@ -242,37 +295,90 @@ class MultiModalAgent:
     ) -> str:
         """综合所有结果生成最终回答"""
         
-        synthesis_prompt = f"""
+        direct = self._direct_answer(primary_result, secondary_results)
+        if direct is not None:
+            return direct
+        
+        synthesis_prompt = self._build_synthesis_prompt(
+            input_text, primary_result, secondary_results, understanding
+        )
+        response = await self.llm.generate(synthesis_prompt)
+        
+        return response["content"]
+    
+    async def _synthesize_results_stream(
+        self, 
+        input_text: str, 
+        primary_result: Dict, 
+        secondary_results: List[Dict], 
+        understanding: Dict
+    ) -> AsyncIterator[str]:
+        """流式生成最终回答，首段文本到达即可开始输出"""
+        
+        synthesis_prompt = self._build_synthesis_prompt(
+            input_text, primary_result, secondary_results, understanding
+        )
+        
+        if hasattr(self.llm, 'stream_generate'):
+            async for chunk in self.llm.stream_generate(synthesis_prompt):
+                if chunk and getattr(chunk, 'content', None):
+                    yield chunk.content
+        else:
+            # 不支持流式的提供商降级为一次性返回
+            response = await self.llm.generate(synthesis_prompt)
+            yield response["content"]
+    
+    def _direct_answer(self, primary_result: Dict, secondary_results: List[Dict]) -> Optional[str]:
+        """没有辅助结果且主要结果本身就是可直接返回的回答时，跳过综合这一次LLM调用
+        
+        只用于非流式路径；传入 on_token 时总是流式生成综合回答
+        """
+        if secondary_results:
+            return None
+        
+        result_type = primary_result.get("type")
+        if result_type in ("text_processing", "data_analysis"):
+            return primary_result["result"]
+        if result_type == "calculation" and primary_result["result"].get("success"):
+            return f"结果: {primary_result['result']['result']}"
+        return None
+    
+    def _build_synthesis_prompt(
+        self, 
+        input_text: str, 
+        primary_result: Dict, 
+        secondary_results: List[Dict], 
+        understanding: Dict
+    ) -> str:
+        """构造综合结果的提示"""
+        return f"""
 用户输入: {input_text}
 识别意图: {understanding['intent']}
 
 主要处理结果:
-{json.dumps(primary_result, ensure_ascii=False, indent=2)}
+{json.dumps(primary_result, ensure_ascii=False, separators=(",", ":"))}
 
 辅助处理结果:
-{json.dumps(secondary_results, ensure_ascii=False, indent=2)}
+{json.dumps(secondary_results, ensure_ascii=False, separators=(",", ":"))}
 
 请基于以上所有信息，为用户提供一个完整、有用的回答。
 """
-        
-        response = await self.llm.generate(synthesis_prompt)
-        
-        return response["content"]
 
 # 专门的多模态应用实例
 class PersonalAssistant:
     """个人助手 - 多模态代理的应用实例"""
     
-    def __init__(self, provider: str = "openai"):
-        self.agent = MultiModalAgent(provider)
+    def __init__(self, provider: str = "openai", http_session=None):
+        self.agent = MultiModalAgent(provider, http_session)
         self.session_context = {}
     
-    async def handle_request(self, user_input: str) -> Dict:
+    async def handle_request(self, user_input: str, on_token: Optional[Callable[[str], None]] = None) -> Dict:
         """处理用户请求"""
         
         result = await self.agent.process_multi_modal_input(
             user_input, 
-            self.session_context
+            self.session_context,
+            on_token=on_token
         )
         
         # 更新会话上下文
@@ -281,6 +387,24 @@ class PersonalAssistant:
         
         return result
     
+    async def handle_requests(self, user_inputs: List[str]) -> List[Dict]:
+        """并发处理多个互不依赖的请求
+        
+        每个请求看到的是开始时会话上下文的同一份快照，全部完成后再按输入顺序更新上下文，
+        结果与各请求完成的先后无关
+        """
+        snapshot = dict(self.session_context)
+        results = await asyncio.gather(*(
+            self.agent.process_multi_modal_input(user_input, dict(snapshot))
+            for user_input in user_inputs
+        ))
+        
+        for user_input, result in zip(user_inputs, results):
+            self.session_context["last_input"] = user_input
+            self.session_context["last_result"] = result["final_answer"]
+        
+        return results
+    
     async def analyze_document(self, file_path: str, question: str) -> Dict:
         """分析文档并回答问题"""
         
@@ -293,12 +417,8 @@ class PersonalAssistant:
         combined_input = f"在 {context} 的背景下，请计算: {calculation}"
         return await self.handle_request(combined_input)
 
-async def main():
-    """演示多模态代理"""
-    
-    print("=== 多模态代理演示 ===")
-    
-    assistant = PersonalAssistant("openai")
+async def run_demo(assistant: PersonalAssistant):
+    """并发演示各类输入的处理，再演示流式输出"""
     
     # 测试不同类型的输入
     test_cases = [
@@ -310,11 +430,11 @@ async def main():
     
     print("测试多种类型的输入处理...\n")
     
-    for i, test_input in enumerate(test_cases, 1):
+    # 各测试输入互不依赖，并发处理后按顺序展示
+    results = await assistant.handle_requests(test_cases)
+    
+    for i, result in enumerate(results, 1):
         print(f"--- 测试 {i} ---")
-        
-        result = await assistant.handle_request(test_input)
-        
         print(f"📥 输入: {result['input']}")
         print(f"🧠 理解: {result['understanding']['primary_type']} - {result['understanding']['intent']}")
         print(f"📤 回答: {result['final_answer'][:200]}...")
@@ -324,9 +444,31 @@ async def main():
         
         print()
     
+    # 流式输出: 最终回答边生成边打印，无需等待完整响应
+    print("--- 流式输出 ---")
+    await assistant.handle_request(
+        "用一句话总结复利的含义",
+        on_token=lambda text: print(text, end="", flush=True)
+    )
+    print("\n")
+    
     print("="*60)
     print("🎯 多模态处理演示完成！")
     print("代理能够自动识别不同类型的输入并选择合适的处理方式。")
 
+async def main():
+    """演示多模态代理"""
+    
+    print("=== 多模态代理演示 ===")
+    
+    if aiohttp is None:
+        await run_demo(PersonalAssistant("openai"))
+        return
+    
+    # 整个演示共享一个HTTP会话，并发请求时复用已建立的TCP/TLS连接
+    connector = aiohttp.TCPConnector(limit=64)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        await run_demo(PersonalAssistant("openai", http_session=session))
+
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -1,43 +1,134 @@
 #!/usr/bin/env python3
 
 import asyncio
+import functools
 import json
+import math
 import os
-import sys
+import time
+from collections import deque
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import Callable, Dict, List, Any, Optional, TypedDict
 
-sys.path.append('../..')
-
-from ai_modular_blocks import create_llm
+from ai_modular_blocks import Message, create_llm
 from ai_modular_blocks.tools import Calculator, FileOperations
+from ai_modular_blocks.utils import parse_llm_json, strip_code_fence
 
-class Agent:
-    """基础代理类 - 纯Python实现"""
+try:
+    import numpy as np  # 可选依赖: 向量化统计计算，未安装时使用纯Python
+except ImportError:
+    np = None
+
+try:
+    import msgspec  # 可选依赖: 按固定结构生成专用解码器，未安装时使用通用JSON解析
+except ImportError:
+    msgspec = None
+
+class AgentReply(TypedDict):
+    """代理回复消息的固定结构"""
+    response: str
+    action_taken: str
+    next_steps: str
+    confidence: float
+
+class TechDesign(TypedDict):
+    """技术方案的固定结构"""
+    architecture: str
+    technologies: List[str]
+    implementation_steps: List[str]
+    potential_challenges: List[str]
+    timeline_estimate: str
+
+if msgspec is not None:
+    _AGENT_REPLY_DECODER = msgspec.json.Decoder(AgentReply)
+    _TECH_DESIGN_DECODER = msgspec.json.Decoder(TechDesign)
+else:
+    _AGENT_REPLY_DECODER = _TECH_DESIGN_DECODER = None
+
+def _decode_reply(content: str, decoder: Any) -> Any:
+    """解析LLM返回的JSON对象；传入 msgspec 专用解码器时优先按固定结构解码，不符合结构时再走通用解析"""
+    if decoder is not None:
+        try:
+            return decoder.decode(strip_code_fence(content))
+        except msgspec.DecodeError:  # 结构校验失败（ValidationError）也是DecodeError的子类
+            pass
+    return parse_llm_json(content)
+
+class _JsonObjectScanner:
+    """增量扫描流式文本，找到第一个顶层JSON对象的闭合位置（跳过字符串内的括号）"""
     
-    def __init__(self, name: str, role: str, provider: str = "openai"):
-        self.name = name
-        self.role = role
-        self.llm = create_llm(provider, api_key=os.getenv(f"{provider.upper()}_API_KEY"))
-        self.capabilities = []
-        self.message_queue = []
-        self.collaboration_history = []
+    def __init__(self):
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
     
-    async def process_message(self, message: Dict, context: Dict = None) -> Dict:
-        """处理来自其他代理的消息"""
-        
-        response_prompt = f"""
-你是 {self.name}，角色：{self.role}
-你的能力：{', '.join(self.capabilities)}
+    def feed(self, text: str) -> int:
+        """返回顶层对象闭合的 '}' 在text中的下标，尚未闭合时返回-1"""
+        for i, ch in enumerate(text):
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif ch == "\\":
+                    self.escaped = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                self.in_string = self.depth > 0
+            elif ch == "{":
+                self.depth += 1
+            elif ch == "}" and self.depth:
+                self.depth -= 1
+                if self.depth == 0:
+                    return i
+        return -1
+
+# 协作记录的容量上限，超出后淘汰最旧的条目（可通过 recall_storage 回调另行持久化）
+HISTORY_MAX_ENTRIES = 1024
+
+def _append_bounded(log: deque, entry: Dict, recall_storage: Optional[Callable[[Dict], None]] = None):
+    """向有界队列追加记录；队列已满时先把即将被淘汰的最旧记录交给 recall_storage"""
+    if recall_storage is not None and len(log) == log.maxlen:
+        recall_storage(log[0])
+    log.append(entry)
+
+def _iso(ts_ns: int) -> str:
+    """把纳秒整数时间戳格式化为ISO字符串，仅在需要展示或导出时调用"""
+    return datetime.fromtimestamp(ts_ns / 1e9).isoformat()
+
+def _to_float(value: Any) -> Optional[float]:
+    """转换为有限浮点数（支持负数和科学计数法），无法转换时返回None"""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
 
-收到消息：
-发送者：{message['from']}
-类型：{message['type']}
-内容：{message['content']}
+# 启动时读取一次各提供商的API密钥，构造代理时只需查字典
+_API_KEYS = {
+    provider: os.getenv(f"{provider.upper()}_API_KEY")
+    for provider in ("openai", "anthropic", "deepseek")
+}
 
-上下文：{json.dumps(context or {}, ensure_ascii=False)}
+@functools.lru_cache(maxsize=4)
+def _get_llm(provider: str, api_key: Optional[str]):
+    """按 (provider, api_key) 复用LLM实例，多个代理共享其HTTP连接池"""
+    return create_llm(provider, api_key=api_key)
 
-请处理这个消息并提供回复。
+def _failure_reply(error: Exception, action: str) -> Dict:
+    """代理调用抛出异常时的占位回复，与正常回复的字段一致"""
+    return {
+        "response": f"{action}: {error}",
+        "action_taken": action,
+        "next_steps": "稍后重试",
+        "confidence": 0.0
+    }
+
+# 代理身份、能力和回复格式放在system消息中，同一代理每次调用都保持字节级一致，
+# 便于服务端前缀缓存（prompt caching）命中；只有收到的消息和上下文作为user消息变化
+_AGENT_SYSTEM_TMPL = """你是 {name}，角色：{role}
+你的能力：{capabilities}
+
+请处理收到的消息并提供回复。
 
 返回JSON格式：
 {{
@@ -47,36 +138,176 @@ class Agent:
   "confidence": 0.9
 }}
 """
+
+_AGENT_MESSAGE_TMPL = """收到消息：
+发送者：{sender}
+类型：{type}
+内容：{content}
+
+上下文：{context}
+"""
+
+# 技术方案设计的固定指令，同样作为system消息前缀
+_DESIGN_SYSTEM_PROMPT = """作为技术专家，请根据用户给出的需求设计技术实现方案。
+
+返回JSON:
+{
+  "architecture": "架构设计描述",
+  "technologies": ["技术1", "技术2"],
+  "implementation_steps": ["步骤1", "步骤2"],
+  "potential_challenges": ["挑战1", "挑战2"],
+  "timeline_estimate": "时间估算"
+}
+"""
+
+@functools.lru_cache(maxsize=128)
+def _dump_context_items(items: tuple) -> str:
+    return json.dumps(dict(items), ensure_ascii=False)
+
+def _dump_context(context: Optional[Dict]) -> str:
+    """序列化上下文，值都可哈希的上下文按内容缓存序列化结果"""
+    if not context:
+        return "{}"
+    try:
+        return _dump_context_items(tuple(context.items()))
+    except TypeError:  # 含有dict/list等不可哈希的值，直接序列化
+        return json.dumps(context, ensure_ascii=False)
+
+class Agent:
+    """基础代理类 - 纯Python实现"""
+    
+    # 固定属性集合，实例不再携带 __dict__，大量代理时更省内存、属性访问更快；
+    # 子类新增属性需在自己的 __slots__ 中声明
+    __slots__ = (
+        "name", "role", "llm", "capabilities", "capabilities_text", "_system_prompt",
+        "message_queue", "collaboration_history", "recall_storage", "inbox", "_consumer"
+    )
+    
+    def __init__(
+        self,
+        name: str,
+        role: str,
+        provider: str = "openai",
+        capabilities: List[str] = None,
+        recall_storage: Optional[Callable[[Dict], None]] = None
+    ):
+        self.name = name
+        self.role = role
+        # 启动后才设置的密钥或其他提供商仍回退到读取环境变量
+        api_key = _API_KEYS.get(provider) or os.getenv(f"{provider.upper()}_API_KEY")
+        self.llm = _get_llm(provider, api_key)
+        self.capabilities = list(capabilities or [])
+        # 能力在构造后不再变化，预先拼好能力描述和system提示，每次处理消息直接复用
+        self.capabilities_text = ', '.join(self.capabilities)
+        self._system_prompt = _AGENT_SYSTEM_TMPL.format(
+            name=name, role=role, capabilities=self.capabilities_text
+        )
+        self.message_queue = []
+        self.collaboration_history = deque(maxlen=HISTORY_MAX_ENTRIES)
+        # 可选回调: 接收从协作历史中淘汰的记录，用于写入磁盘等完整审计日志
+        self.recall_storage = recall_storage
+        # 收件箱与后台消息处理循环，首次收到消息时在运行中的事件循环内创建
+        self.inbox: Optional[asyncio.Queue] = None
+        self._consumer: Optional[asyncio.Task] = None
+    
+    def start(self):
+        """启动后台消息处理循环（需在运行中的事件循环内调用），已启动时不做任何事"""
+        if self._consumer is None:
+            self.inbox = asyncio.Queue()
+            self._consumer = asyncio.get_running_loop().create_task(self._run_loop())
+    
+    async def stop(self):
+        """停止后台消息处理循环"""
+        if self._consumer is not None:
+            self._consumer.cancel()
+            try:
+                await self._consumer
+            except asyncio.CancelledError:
+                pass
+            self._consumer = None
+    
+    async def _run_loop(self):
+        """逐条处理收件箱中的消息，并通过每条消息附带的Future把回复交还给发送者"""
+        while True:
+            message, context, reply = await self.inbox.get()
+            try:
+                result = await self.process_message(message, context)
+            except asyncio.CancelledError:
+                reply.cancel()
+                raise
+            except Exception as e:
+                if not reply.done():
+                    reply.set_exception(e)
+            else:
+                if not reply.done():  # 发送者可能已放弃等待
+                    reply.set_result(result)
+            finally:
+                self.inbox.task_done()
+    
+    async def process_message(self, message: Dict, context: Dict = None) -> Dict:
+        """处理来自其他代理的消息"""
         
-        response = await self.llm.generate(response_prompt)
-        
-        try:
-            content = response["content"].strip()
-            if content.startswith('```json'):
-                content = content[7:]
-            if content.endswith('```'):
-                content = content[:-3]
-            
-            result = json.loads(content)
-            
-            # 记录协作历史
-            self.collaboration_history.append({
-                "timestamp": datetime.now().isoformat(),
-                "type": "received_message",
-                "from": message['from'],
-                "message": message,
-                "response": result
-            })
-            
-            return result
-            
-        except:
+        response_messages = [
+            Message(
+                role="system",
+                content=self._system_prompt
+            ),
+            Message(role="user", content=_AGENT_MESSAGE_TMPL.format(
+                sender=message['from'],
+                type=message['type'],
+                content=message['content'],
+                context=_dump_context(context)
+            )),
+        ]
+        
+        content = await self._complete_json(response_messages)
+        
+        result = _decode_reply(content, _AGENT_REPLY_DECODER)
+        if result is None:
             return {
                 "response": f"我是{self.name}，收到了你的消息，正在处理中...",
                 "action_taken": "消息接收",
                 "next_steps": "等待进一步指令",
                 "confidence": 0.5
             }
+        
+        # 记录协作历史
+        _append_bounded(self.collaboration_history, {
+            "ts_ns": time.time_ns(),
+            "type": "received_message",
+            "from": message['from'],
+            "message": message,
+            "response": result
+        }, self.recall_storage)
+        
+        return result
+    
+    async def _complete_json(self, prompt) -> str:
+        """请求LLM并返回回复文本
+        
+        提供商支持流式生成时边接收边扫描，顶层JSON对象一闭合就停止接收，
+        不必等待模型输出对象之后的多余内容
+        """
+        if not hasattr(self.llm, "stream_generate"):
+            response = await self.llm.generate(prompt)
+            return response["content"]
+        
+        parts = []
+        scanner = _JsonObjectScanner()
+        stream = self.llm.stream_generate(prompt)
+        try:
+            async for chunk in stream:
+                text = getattr(chunk, "content", None)
+                if not text:
+                    continue
+                end = scanner.feed(text)
+                if end >= 0:
+                    parts.append(text[:end + 1])
+                    break
+                parts.append(text)
+        finally:
+            await stream.aclose()  # 提前结束时关闭底层流，释放连接
+        return "".join(parts)
     
     async def send_message(self, to_agent: 'Agent', message_type: str, content: str, context: Dict = None) -> Dict:
         """向其他代理发送消息"""
@@ -86,31 +317,45 @@ class Agent:
             "to": to_agent.name,
             "type": message_type,
             "content": content,
-            "timestamp": datetime.now().isoformat(),
+            "ts_ns": time.time_ns(),
             "context": context or {}
         }
         
-        # 发送消息并获取响应
-        response = await to_agent.process_message(message, context)
+        # 投递到对方收件箱，由对方的消息处理循环处理；发送者只等待回复
+        to_agent.start()
+        reply = asyncio.get_running_loop().create_future()
+        await to_agent.inbox.put((message, context, reply))
+        response = await reply
         
         # 记录发送历史
-        self.collaboration_history.append({
-            "timestamp": datetime.now().isoformat(),
+        _append_bounded(self.collaboration_history, {
+            "ts_ns": time.time_ns(),
             "type": "sent_message",
             "to": to_agent.name,
             "message": message,
             "response": response
-        })
+        }, self.recall_storage)
         
         return response
 
 class DataAnalyst(Agent):
     """数据分析师代理"""
     
+    __slots__ = ("_calculator",)
+    
     def __init__(self, provider: str = "openai"):
-        super().__init__("DataAnalyst", "数据分析专家", provider)
-        self.capabilities = ["数据分析", "统计计算", "趋势识别", "报告生成"]
-        self.calculator = Calculator()
+        super().__init__(
+            "DataAnalyst", "数据分析专家", provider,
+            capabilities=["数据分析", "统计计算", "趋势识别", "报告生成"]
+        )
+        self._calculator: Optional[Calculator] = None
+    
+    @property
+    def calculator(self) -> Calculator:
+        """计算器工具，首次使用时才创建"""
+        if self._calculator is None:
+            self._calculator = Calculator()
+        return self._calculator
     
     async def analyze_data(self, data: Dict) -> Dict:
         """分析数据"""
@@ -118,13 +363,15 @@ class DataAnalyst(Agent):
         # 执行一些基本统计
         numbers = []
         if "values" in data:
-            numbers = [float(x) for x in data["values"] if str(x).replace('.','').isdigit()]
+            numbers = [v for v in map(_to_float, data["values"]) if v is not None]
         
         if numbers:
-            total = sum(numbers)
+            if np is not None:
+                arr = np.fromiter(numbers, dtype=np.float64, count=len(numbers))
+                total, max_val, min_val = float(arr.sum()), float(arr.max()), float(arr.min())
+            else:
+                total, max_val, min_val = sum(numbers), max(numbers), min(numbers)
             avg = total / len(numbers)
-            max_val = max(numbers)
-            min_val = min(numbers)
             
             analysis = {
                 "count": len(numbers),
@@ -141,16 +388,20 @@ class DataAnalyst(Agent):
             "analyst": self.name,
             "analysis": analysis,
             "recommendations": ["需要更多数据", "建议进行深入分析"],
-            "timestamp": datetime.now().isoformat()
+            "ts_ns": time.time_ns()
         }
 
 class ProjectManager(Agent):
     """项目经理代理"""
     
+    __slots__ = ("active_projects",)
+    
     def __init__(self, provider: str = "openai"):
-        super().__init__("ProjectManager", "项目协调和管理", provider)
-        self.capabilities = ["任务分配", "进度跟踪", "团队协调", "决策制定"]
-        self.active_projects = []
+        super().__init__(
+            "ProjectManager", "项目协调和管理", provider,
+            capabilities=["任务分配", "进度跟踪", "团队协调", "决策制定"]
+        )
+        self.active_projects = deque(maxlen=HISTORY_MAX_ENTRIES)
     
     async def coordinate_project(self, project_goal: str, team_agents: List[Agent]) -> Dict:
         """协调项目执行"""
@@ -162,16 +413,26 @@ class ProjectManager(Agent):
             "goal": project_goal,
             "team": [agent.name for agent in team_agents],
             "status": "active",
-            "start_time": datetime.now().isoformat()
+            "start_ts_ns": time.time_ns()
         }
         
         self.active_projects.append(project)
         
-        # 向团队成员分配任务
-        coordination_results = []
+        # 提示中的项目上下文使用可读的开始时间，内部仍保留纳秒整数
+        project_context = {key: value for key, value in project.items() if key != "start_ts_ns"}
+        project_context["start_time"] = _iso(project["start_ts_ns"])
+        
+        # 向团队成员分配任务 - 各成员的分配互不依赖，并发执行
+        assignments = await asyncio.gather(
+            *(self.assign_task_to_agent(agent, project_goal, project_context) for agent in team_agents),
+            return_exceptions=True
+        )
         
-        for agent in team_agents:
-            task_assignment = await self.assign_task_to_agent(agent, project_goal, project)
+        # 单个成员分配失败不影响其他成员
+        coordination_results = []
+        for agent, task_assignment in zip(team_agents, assignments):
+            if isinstance(task_assignment, Exception):
+                task_assignment = _failure_reply(task_assignment, "任务分配失败")
             coordination_results.append({
                 "agent": agent.name,
                 "assignment": task_assignment
@@ -191,7 +452,7 @@ class ProjectManager(Agent):
         task_content = f"""
 项目目标: {project_goal}
 你的角色: {agent.role}
-你的能力: {', '.join(agent.capabilities)}
+你的能力: {agent.capabilities_text}
 
 请根据项目目标和你的专长，制定你负责的具体任务计划。
 """
@@ -206,39 +467,36 @@ class ProjectManager(Agent):
 class TechnicalExpert(Agent):
     """技术专家代理"""
     
+    __slots__ = ("_file_ops",)
+    
     def __init__(self, provider: str = "openai"):
-        super().__init__("TechnicalExpert", "技术实现和架构设计", provider)
-        self.capabilities = ["系统设计", "技术选型", "代码审查", "性能优化"]
-        self.file_ops = FileOperations()
+        super().__init__(
+            "TechnicalExpert", "技术实现和架构设计", provider,
+            capabilities=["系统设计", "技术选型", "代码审查", "性能优化"]
+        )
+        self._file_ops: Optional[FileOperations] = None
+    
+    @property
+    def file_ops(self) -> FileOperations:
+        """文件操作工具，首次使用时才创建"""
+        if self._file_ops is None:
+            self._file_ops = FileOperations()
+        return self._file_ops
     
     async def design_solution(self, requirements: str) -> Dict:
         """设计技术方案"""
         
-        design_prompt = f"""
-需求: {requirements}
-
-作为技术专家，请设计技术实现方案：
-
-返回JSON:
-{{
-  "architecture": "架构设计描述",
-  "technologies": ["技术1", "技术2"],
-  "implementation_steps": ["步骤1", "步骤2"],
-  "potential_challenges": ["挑战1", "挑战2"],
-  "timeline_estimate": "时间估算"
-}}
-"""
+        # 固定的设计指令作为system消息前缀，只有需求作为user消息变化
+        design_messages = [
+            Message(role="system", content=_DESIGN_SYSTEM_PROMPT),
+            Message(role="user", content=f"需求: {requirements}"),
+        ]
         
-        response = await self.llm.generate(design_prompt)
+        content = await self._complete_json(design_messages)
         
-        try:
-            content = response["content"].strip()
-            if content.startswith('```json'):
-                content = content[7:]
-            if content.endswith('```'):
-                content = content[:-3]
-            return json.loads(content)
-        except:
+        design = _decode_reply(content, _TECH_DESIGN_DECODER)
+        if design is None:
+            # 默认方案只在解析失败时构造，正常路径不分配
             return {
                 "architecture": "基础三层架构",
                 "technologies": ["Python", "数据库"],
@@ -246,20 +504,27 @@ class TechnicalExpert(Agent):
                 "potential_challenges": ["性能优化", "扩展性"],
                 "timeline_estimate": "4-6周"
             }
+        return design
 
 class MultiAgentSystem:
     """多代理协作系统"""
     
-    def __init__(self):
+    def __init__(self, recall_storage: Optional[Callable[[Dict], None]] = None):
         self.agents = {}
-        self.message_history = []
-        self.active_collaborations = []
+        self.message_history = deque(maxlen=HISTORY_MAX_ENTRIES)
+        self.active_collaborations = deque(maxlen=HISTORY_MAX_ENTRIES)
+        # 可选回调: 接收从协作记录中淘汰的条目
+        self.recall_storage = recall_storage
     
     def add_agent(self, agent: Agent):
         """添加代理到系统"""
         self.agents[agent.name] = agent
         print(f"➕ 已添加代理: {agent.name} ({agent.role})")
     
+    async def shutdown(self):
+        """停止所有代理的后台消息处理循环"""
+        await asyncio.gather(*(agent.stop() for agent in self.agents.values()))
+    
     async def start_collaboration(self, project_goal: str, involved_agents: List[str]) -> Dict:
         """启动多代理协作"""
         
@@ -279,31 +544,37 @@ class MultiAgentSystem:
             # 没有项目经理，简单的点对点协作
             collaboration_result = await self._simple_collaboration(project_goal, agents)
         
-        self.active_collaborations.append({
+        _append_bounded(self.active_collaborations, {
             "goal": project_goal,
             "agents": involved_agents,
-            "start_time": datetime.now().isoformat(),
+            "start_ts_ns": time.time_ns(),
             "result": collaboration_result
-        })
+        }, self.recall_storage)
         
         return collaboration_result
     
     async def _simple_collaboration(self, goal: str, agents: List[Agent]) -> Dict:
         """简单的代理间协作"""
         
-        results = []
+        message = {
+            "from": "System",
+            "type": "collaboration_request",
+            "content": f"请为项目目标提供你的专业意见: {goal}"
+        }
         
-        # 每个代理处理目标
-        for agent in agents:
-            individual_result = await agent.process_message({
-                "from": "System",
-                "type": "collaboration_request",
-                "content": f"请为项目目标提供你的专业意见: {goal}"
-            })
-            
+        # 每个代理独立处理目标，并发执行；单个代理失败不影响其他代理
+        contributions = await asyncio.gather(
+            *(agent.process_message(message) for agent in agents),
+            return_exceptions=True
+        )
+        
+        results = []
+        for agent, contribution in zip(agents, contributions):
+            if isinstance(contribution, Exception):
+                contribution = _failure_reply(contribution, "处理失败")
             results.append({
                 "agent": agent.name,
-                "contribution": individual_result
+                "contribution": contribution
             })
         
         return {
@@ -317,10 +588,12 @@ class MultiAgentSystem:
         
         agent_status = {}
         for name, agent in self.agents.items():
+            history = agent.collaboration_history
             agent_status[name] = {
                 "role": agent.role,
                 "capabilities": agent.capabilities,
-                "message_count": len(agent.collaboration_history)
+                "message_count": len(history),
+                "last_active": _iso(history[-1]["ts_ns"]) if history else None
             }
         
         return {
@@ -349,14 +622,23 @@ async def main():
     
     print("\n" + "="*60 + "\n")
     
+    # 项目1的协作与项目2的技术方案设计互不依赖，并发执行
+    tech_expert = system.agents["TechnicalExpert"]
+    result1, design_result = await asyncio.gather(
+        system.start_collaboration(
+            "开发一个销售数据分析系统，能够处理大量数据并生成可视化报告",
+            ["ProjectManager", "DataAnalyst", "TechnicalExpert"]
+        ),
+        tech_expert.design_solution(
+            "设计一个智能客服系统，支持多轮对话、知识库查询和人工转接"
+        )
+    )
+    
+    print("\n" + "="*60 + "\n")
+    
     # 示例1: 数据分析项目协作
     print("--- 项目1: 销售数据分析系统 ---")
     
-    result1 = await system.start_collaboration(
-        "开发一个销售数据分析系统，能够处理大量数据并生成可视化报告",
-        ["ProjectManager", "DataAnalyst", "TechnicalExpert"]
-    )
-    
     print(f"🎯 协作结果:")
     if "assignments" in result1:
         for assignment in result1["assignments"]:
@@ -367,18 +649,12 @@ async def main():
     # 示例2: 技术方案设计
     print("--- 项目2: AI客服系统设计 ---") 
     
-    # 技术专家独立工作
-    tech_expert = system.agents["TechnicalExpert"]
-    design_result = await tech_expert.design_solution(
-        "设计一个智能客服系统，支持多轮对话、知识库查询和人工转接"
-    )
-    
     print(f"🔧 技术方案:")
     print(f"架构: {design_result['architecture']}")
     print(f"技术栈: {', '.join(design_result['technologies'])}")
     print(f"预估时间: {design_result['timeline_estimate']}")
     
-    # 数据分析师提供数据视角
+    # 数据分析师提供数据视角（依赖技术方案，需在其完成后执行）
     data_analyst = system.agents["DataAnalyst"]
     data_response = await data_analyst.process_message({
         "from": "TechnicalExpert",
@@ -392,6 +668,8 @@ async def main():
     final_status = system.get_system_status()
     print(f"总代理数: {final_status['total_agents']}")
     print(f"协作项目数: {final_status['active_collaborations']}")
+    
+    await system.shutdown()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -1,16 +1,53 @@
 #!/usr/bin/env python3
 
 import asyncio
+import hashlib
+import itertools
 import json
 import os
 import sys
+import time
+from collections import deque
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Optional
 
 sys.path.append('../..')
 
 from ai_modular_blocks import create_llm
 from ai_modular_blocks.tools import Calculator, FileOperations, WebClient
+from ai_modular_blocks.utils import parse_llm_json
+
+try:
+    import aiohttp  # WebClient的依赖，用于在整个应用中共享一个连接池
+except ImportError:
+    aiohttp = None
+
+try:
+    # 可选依赖: 基于libuv的事件循环（uvloop>=0.18 提供 run），未安装时使用asyncio默认循环
+    from uvloop import run as uvloop_run
+except ImportError:
+    uvloop_run = None
+
+# 演示用的模拟业务数据，只读共享（序列用元组，避免被意外修改）
+_SIMULATED_DATA = {
+    "revenue": (1200000, 1350000, 1180000, 1480000, 1620000, 1750000),
+    "expenses": (800000, 900000, 850000, 980000, 1100000, 1150000),
+    "customers": (2500, 2800, 2650, 3100, 3400, 3650),
+    "market_share": (0.12, 0.13, 0.12, 0.14, 0.15, 0.16),
+    "months": ("Jan", "Feb", "Mar", "Apr", "May", "Jun"),
+    "industry": "科技服务",
+    "company_size": "中型企业"
+}
+
+# 保留的分析历史条数上限，长期运行时内存占用保持恒定
+ANALYSIS_HISTORY_MAX = 1000
+
+# LLM响应磁盘缓存的建议目录（默认关闭，开发或可复现测试时通过 llm_cache_dir 开启）
+LLM_CACHE_DIR = ".llm_cache"
+
+def _cache_key(*parts: str) -> str:
+    """为一组文本生成稳定的内容哈希键"""
+    return hashlib.blake2b("\x00".join(parts).encode("utf-8"), digest_size=16).hexdigest()
 
 class SmartBusinessAnalyzer:
     """
@@ -20,18 +57,31 @@ class SmartBusinessAnalyzer:
     集成多种AI能力：数据分析、报告生成、预测建议
     """
     
-    def __init__(self, provider: str = "openai"):
+    # 固定属性集合，实例不再携带 __dict__，按请求创建实例时更省内存、属性访问更快
+    __slots__ = (
+        "llm", "calculator", "file_ops", "web_client",
+        "analysis_history", "business_knowledge", "_report_seq", "app_config",
+        "llm_cache_dir"
+    )
+    
+    def __init__(self, provider: str = "openai", http_session=None,
+                 llm_cache_dir: Optional[str] = None):
         # 框架的核心 - 只需要一行代码创建LLM
         self.llm = create_llm(provider, api_key=os.getenv(f"{provider.upper()}_API_KEY"))
         
         # 独立工具 - 可以单独使用，不依赖框架
         self.calculator = Calculator()
         self.file_ops = FileOperations()
-        self.web_client = WebClient()
+        # 传入共享的 aiohttp.ClientSession 时，所有网页请求复用同一个连接池
+        self.web_client = WebClient(session=http_session)
+        # 传入目录（如 LLM_CACHE_DIR）时开启LLM响应缓存，默认每次都实时调用LLM
+        self.llm_cache_dir = llm_cache_dir
         
         # 应用状态
-        self.analysis_history = []
+        self.analysis_history = deque(maxlen=ANALYSIS_HISTORY_MAX)
         self.business_knowledge = {}
+        # 分析序号（同时作为报告文件序号），并发分析在同一秒内完成时文件名也不会冲突
+        self._report_seq = itertools.count(1)
         
         # 应用配置
         self.app_config = {
@@ -49,29 +99,38 @@ class SmartBusinessAnalyzer:
         print(f"🏢 开始商业表现分析...")
         print(f"📊 数据源: {data_source}")
         
+        # 每次分析只取一次时间，数据时间戳、历史记录和报告文件名共用
         analysis_start = datetime.now()
+        start_iso = analysis_start.isoformat()
+        start_counter = time.perf_counter()
         
         try:
             # 步骤1: 数据获取和预处理
             print("📥 步骤1: 获取业务数据...")
-            raw_data = await self._fetch_business_data(data_source)
+            raw_data = await self._fetch_business_data(data_source, start_iso)
             
+            # 步骤2和3只依赖原始数据，互不依赖，并发执行
             # 步骤2: 财务指标计算
             print("💰 步骤2: 计算财务指标...")
-            financial_metrics = await self._calculate_financial_metrics(raw_data)
-            
             # 步骤3: 市场分析
             print("📈 步骤3: 进行市场分析...")
-            market_analysis = await self._analyze_market_trends(raw_data)
+            financial_metrics, market_analysis = await asyncio.gather(
+                self._calculate_financial_metrics(raw_data),
+                self._analyze_market_trends(raw_data)
+            )
+            
+            # 财务指标和市场分析在步骤4、5的提示中都会用到，只序列化一次
+            financial_json = json.dumps(financial_metrics, ensure_ascii=False)
+            market_json = json.dumps(market_analysis, ensure_ascii=False)
             
             # 步骤4: 风险评估
             print("⚠️ 步骤4: 评估业务风险...")
-            risk_assessment = await self._assess_business_risks(financial_metrics, market_analysis)
+            risk_assessment = await self._assess_business_risks(financial_json, market_json)
             
             # 步骤5: 生成洞察和建议
             print("💡 步骤5: 生成商业洞察...")
             insights = await self._generate_business_insights(
-                financial_metrics, market_analysis, risk_assessment
+                financial_json, market_json, risk_assessment
             )
             
             # 步骤6: 创建综合报告
@@ -81,14 +140,15 @@ class SmartBusinessAnalyzer:
             )
             
             # 步骤7: 保存结果
-            report_file = f"business_analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+            analysis_id = next(self._report_seq)
+            report_file = f"business_analysis_{analysis_start.strftime('%Y%m%d_%H%M%S')}_{analysis_id}.json"
             await self._save_analysis_results(final_report, report_file)
             
-            analysis_duration = (datetime.now() - analysis_start).total_seconds()
+            analysis_duration = time.perf_counter() - start_counter
             
             # 记录分析历史
             self.analysis_history.append({
-                "timestamp": analysis_start.isoformat(),
+                "timestamp": start_iso,
                 "data_source": data_source,
                 "duration": analysis_duration,
                 "report_file": report_file,
@@ -100,7 +160,7 @@ class SmartBusinessAnalyzer:
             
             return {
                 "success": True,
-                "analysis_id": len(self.analysis_history),
+                "analysis_id": analysis_id,
                 "data_source": data_source,
                 "duration": analysis_duration,
                 "report_file": report_file,
@@ -117,8 +177,35 @@ class SmartBusinessAnalyzer:
                 "data_source": data_source
             }
     
-    async def _fetch_business_data(self, source: str) -> Dict:
-        """获取业务数据"""
+    async def _generate_json(self, prompt: str) -> Optional[Dict]:
+        """调用LLM并解析返回的JSON对象，解析失败时返回None
+        
+        开启缓存时按 (提供商, 模型, 提示) 的哈希读写磁盘缓存，只缓存能解析的回复
+        """
+        if self.llm_cache_dir is None:
+            response = await self.llm.generate(prompt)
+            return parse_llm_json(response["content"])
+        
+        key = _cache_key(
+            getattr(self.llm, "provider_name", ""),
+            str(getattr(getattr(self.llm, "config", None), "model", "")),
+            prompt
+        )
+        cache_path = os.path.join(self.llm_cache_dir, f"{key}.json")
+        cached = await self.file_ops.read_file(cache_path)
+        if cached["success"]:
+            parsed = parse_llm_json(cached["content"])
+            if parsed is not None:
+                return parsed
+        
+        response = await self.llm.generate(prompt)
+        parsed = parse_llm_json(response["content"])
+        if parsed is not None:
+            await self.file_ops.write_file(cache_path, json.dumps(parsed, ensure_ascii=False))
+        return parsed
+    
+    async def _fetch_business_data(self, source: str, timestamp: str) -> Dict:
+        """获取业务数据，timestamp为本次分析开始时间（ISO格式）"""
         
         # 模拟从不同源获取数据
         if source.startswith("http"):
@@ -128,7 +215,7 @@ class SmartBusinessAnalyzer:
                 return {
                     "source_type": "web_api",
                     "raw_content": web_result["content"][:1000],
-                    "timestamp": datetime.now().isoformat()
+                    "timestamp": timestamp
                 }
         
         elif source.endswith(('.json', '.csv', '.txt')):
@@ -140,28 +227,20 @@ class SmartBusinessAnalyzer:
                     return {
                         "source_type": "file",
                         "data": data,
-                        "timestamp": datetime.now().isoformat()
+                        "timestamp": timestamp
                     }
                 except:
                     return {
                         "source_type": "file",
                         "raw_content": file_result["content"],
-                        "timestamp": datetime.now().isoformat()
+                        "timestamp": timestamp
                     }
         
-        # 生成模拟数据用于演示
+        # 返回共享的模拟数据用于演示
         return {
             "source_type": "simulated",
-            "data": {
-                "revenue": [1200000, 1350000, 1180000, 1480000, 1620000, 1750000],
-                "expenses": [800000, 900000, 850000, 980000, 1100000, 1150000],
-                "customers": [2500, 2800, 2650, 3100, 3400, 3650],
-                "market_share": [0.12, 0.13, 0.12, 0.14, 0.15, 0.16],
-                "months": ["Jan", "Feb", "Mar", "Apr", "May", "Jun"],
-                "industry": "科技服务",
-                "company_size": "中型企业"
-            },
-            "timestamp": datetime.now().isoformat()
+            "data": _SIMULATED_DATA,
+            "timestamp": timestamp
         }
     
     async def _calculate_financial_metrics(self, data: Dict) -> Dict:
@@ -179,19 +258,14 @@ class SmartBusinessAnalyzer:
             revenues = business_data["revenue"]
             expenses = business_data["expenses"]
             
-            # 计算利润
-            profits = []
-            for i in range(len(revenues)):
-                if i < len(expenses):
-                    profit = revenues[i] - expenses[i]
-                    profits.append(profit)
+            # 计算利润（按两个序列中较短的长度逐月相减）。序列来自JSON或模拟数据，
+            # 都是Python列表/元组，转成numpy数组再转回的开销大于直接求和
+            profits = [r - e for r, e in zip(revenues, expenses)]
+            total_revenue, total_expenses = sum(revenues), sum(expenses)
             
             # 使用计算器计算统计指标
             if revenues:
-                total_revenue = sum(revenues)
                 avg_revenue = total_revenue / len(revenues)
-                
-                total_expenses = sum(expenses)
                 avg_expenses = total_expenses / len(expenses)
                 
                 profit_margin = ((total_revenue - total_expenses) / total_revenue * 100) if total_revenue > 0 else 0
@@ -251,34 +325,28 @@ class SmartBusinessAnalyzer:
 }}
 """
         
-        response = await self.llm.generate(market_prompt)
-        
-        try:
-            content = response["content"].strip()
-            if content.startswith('```json'):
-                content = content[7:]
-            if content.endswith('```'):
-                content = content[:-3]
-            return json.loads(content)
-        except:
-            return {
-                "market_trend": "稳定",
-                "growth_drivers": ["数字化转型", "市场需求增长"],
-                "competitive_landscape": "竞争激烈",
-                "opportunities": ["新兴市场", "产品创新"],
-                "challenges": ["成本上升", "监管变化"],
-                "industry_outlook": "谨慎乐观",
-                "confidence_score": 0.7
-            }
+        parsed = await self._generate_json(market_prompt)
+        if parsed is not None:
+            return parsed
+        # 只在解析失败时才构造默认结果
+        return {
+            "market_trend": "稳定",
+            "growth_drivers": ["数字化转型", "市场需求增长"],
+            "competitive_landscape": "竞争激烈",
+            "opportunities": ["新兴市场", "产品创新"],
+            "challenges": ["成本上升", "监管变化"],
+            "industry_outlook": "谨慎乐观",
+            "confidence_score": 0.7
+        }
     
-    async def _assess_business_risks(self, financial_metrics: Dict, market_analysis: Dict) -> Dict:
-        """评估业务风险"""
+    async def _assess_business_risks(self, financial_json: str, market_json: str) -> Dict:
+        """评估业务风险（传入已序列化的财务指标和市场分析）"""
         
         risk_prompt = f"""
 基于财务指标和市场分析评估业务风险:
 
-财务指标: {json.dumps(financial_metrics, ensure_ascii=False)}
-市场分析: {json.dumps(market_analysis, ensure_ascii=False)}
+财务指标: {financial_json}
+市场分析: {market_json}
 
 评估以下风险类别:
 
@@ -299,39 +367,33 @@ class SmartBusinessAnalyzer:
 }}
 """
         
-        response = await self.llm.generate(risk_prompt)
-        
-        try:
-            content = response["content"].strip()
-            if content.startswith('```json'):
-                content = content[7:]
-            if content.endswith('```'):
-                content = content[:-3]
-            return json.loads(content)
-        except:
-            return {
-                "overall_risk_level": "中",
-                "financial_risks": [
-                    {"type": "现金流风险", "level": "中", "description": "需要关注现金流管理"}
-                ],
-                "market_risks": [
-                    {"type": "竞争风险", "level": "中", "description": "市场竞争加剧"}
-                ],
-                "operational_risks": [
-                    {"type": "运营效率", "level": "低", "description": "运营相对稳定"}
-                ],
-                "mitigation_strategies": ["多元化收入", "成本控制"],
-                "risk_score": 60
-            }
+        parsed = await self._generate_json(risk_prompt)
+        if parsed is not None:
+            return parsed
+        # 只在解析失败时才构造默认结果
+        return {
+            "overall_risk_level": "中",
+            "financial_risks": [
+                {"type": "现金流风险", "level": "中", "description": "需要关注现金流管理"}
+            ],
+            "market_risks": [
+                {"type": "竞争风险", "level": "中", "description": "市场竞争加剧"}
+            ],
+            "operational_risks": [
+                {"type": "运营效率", "level": "低", "description": "运营相对稳定"}
+            ],
+            "mitigation_strategies": ["多元化收入", "成本控制"],
+            "risk_score": 60
+        }
     
-    async def _generate_business_insights(self, financial_metrics: Dict, market_analysis: Dict, risk_assessment: Dict) -> Dict:
-        """生成商业洞察"""
+    async def _generate_business_insights(self, financial_json: str, market_json: str, risk_assessment: Dict) -> Dict:
+        """生成商业洞察（传入已序列化的财务指标和市场分析）"""
         
         insights_prompt = f"""
 基于完整的商业分析数据，生成深度洞察和建议:
 
-财务表现: {json.dumps(financial_metrics, ensure_ascii=False)}
-市场趋势: {json.dumps(market_analysis, ensure_ascii=False)}  
+财务表现: {financial_json}
+市场趋势: {market_json}  
 风险评估: {json.dumps(risk_assessment, ensure_ascii=False)}
 
 请提供:
@@ -349,33 +411,36 @@ class SmartBusinessAnalyzer:
 }}
 """
         
-        response = await self.llm.generate(insights_prompt)
-        
-        try:
-            content = response["content"].strip()
-            if content.startswith('```json'):
-                content = content[7:]
-            if content.endswith('```'):
-                content = content[:-3]
-            return json.loads(content)
-        except:
-            return {
-                "key_insights": ["收入增长稳定", "客户基础扩大", "需要控制成本"],
-                "strengths": ["强劲增长", "客户忠诚度高"],
-                "weaknesses": ["成本上升", "利润率下降"],
-                "recommendations": [
-                    {"priority": "高", "action": "优化成本结构", "expected_impact": "提高利润率5-10%"},
-                    {"priority": "中", "action": "扩大市场份额", "expected_impact": "收入增长15%"}
-                ],
-                "next_quarter_forecast": {"revenue": 1800000, "growth_rate": 8.5},
-                "strategic_priorities": ["数字化转型", "客户体验优化"]
-            }
+        parsed = await self._generate_json(insights_prompt)
+        if parsed is not None:
+            return parsed
+        # 只在解析失败时才构造默认结果
+        return {
+            "key_insights": ["收入增长稳定", "客户基础扩大", "需要控制成本"],
+            "strengths": ["强劲增长", "客户忠诚度高"],
+            "weaknesses": ["成本上升", "利润率下降"],
+            "recommendations": [
+                {"priority": "高", "action": "优化成本结构", "expected_impact": "提高利润率5-10%"},
+                {"priority": "中", "action": "扩大市场份额", "expected_impact": "收入增长15%"}
+            ],
+            "next_quarter_forecast": {"revenue": 1800000, "growth_rate": 8.5},
+            "strategic_priorities": ["数字化转型", "客户体验优化"]
+        }
     
     async def _create_comprehensive_report(self, raw_data: Dict, financial_metrics: Dict, 
                                          market_analysis: Dict, risk_assessment: Dict, 
                                          insights: Dict) -> Dict:
         """创建综合分析报告"""
         
+        # 单次遍历按优先级分桶建议
+        immediate_actions, medium_term_goals = [], []
+        for rec in insights.get("recommendations", []):
+            priority = rec.get("priority")
+            if priority == "高":
+                immediate_actions.append(rec["action"])
+            elif priority == "中":
+                medium_term_goals.append(rec["action"])
+        
         report = {
             "report_metadata": {
                 "title": "智能商业表现分析报告",
@@ -399,8 +464,8 @@ class SmartBusinessAnalyzer:
             "strategic_insights": insights,
             
             "recommendations_summary": {
-                "immediate_actions": [r["action"] for r in insights.get("recommendations", []) if r.get("priority") == "高"],
-                "medium_term_goals": [r["action"] for r in insights.get("recommendations", []) if r.get("priority") == "中"],
+                "immediate_actions": immediate_actions,
+                "medium_term_goals": medium_term_goals,
                 "long_term_strategy": insights.get("strategic_priorities", [])
             },
             
@@ -416,8 +481,7 @@ class SmartBusinessAnalyzer:
     async def _save_analysis_results(self, report: Dict, filename: str):
         """保存分析结果"""
         
-        report_json = json.dumps(report, ensure_ascii=False, indent=2)
-        await self.file_ops.write_file(filename, report_json)
+        report_json = json.dumps(report, ensure_ascii=False, indent=2).encode("utf-8")
         
         # 也创建一个简化的文本摘要
         summary_filename = filename.replace('.json', '_summary.txt')
@@ -441,7 +505,11 @@ class SmartBusinessAnalyzer:
         for i, rec in enumerate(report['strategic_insights'].get('recommendations', [])[:3], 1):
             summary_text += f"{i}. {rec.get('action', 'N/A')} (优先级: {rec.get('priority', 'N/A')})\n"
         
-        await self.file_ops.write_file(summary_filename, summary_text)
+        # FileOperations在线程中执行磁盘写入，两个文件并发写出
+        await asyncio.gather(
+            self.file_ops.write_file(filename, report_json),
+            self.file_ops.write_file(summary_filename, summary_text)
+        )
     
     def get_application_status(self) -> Dict:
         """获取应用状态"""
@@ -450,8 +518,9 @@ class SmartBusinessAnalyzer:
             "app_info": self.app_config,
             "analysis_history": {
                 "total_analyses": len(self.analysis_history),
-                "successful_analyses": len([a for a in self.analysis_history if a.get("success")]),
-                "recent_analyses": self.analysis_history[-5:] if self.analysis_history else []
+                "successful_analyses": sum(1 for a in self.analysis_history if a.get("success")),
+                # 从队尾按下标取最近5条，保持时间顺序
+                "recent_analyses": [self.analysis_history[i] for i in range(-min(5, len(self.analysis_history)), 0)]
             },
             "system_capabilities": {
                 "llm_provider": "openai",  # 从框架获取
@@ -461,7 +530,7 @@ class SmartBusinessAnalyzer:
             "uptime": "运行中"
         }
 
-async def main():
+async def run_demo(app: SmartBusinessAnalyzer):
     """演示完整的智能商业分析应用"""
     
     print("="*80)
@@ -469,9 +538,6 @@ async def main():
     print("智能商业分析系统")
     print("="*80)
     
-    # 创建应用实例 - 展示框架的简洁性
-    app = SmartBusinessAnalyzer("openai")
-    
     # 显示应用状态
     status = app.get_application_status()
     print(f"\n📊 应用信息:")
@@ -488,9 +554,29 @@ async def main():
     # 执行完整的商业分析流程
     print("🎯 开始执行完整商业分析...")
     
+    # 创建演示数据文件供案例2使用
+    demo_data = {
+        "company_name": "创新科技有限公司",
+        "revenue": [980000, 1120000, 1050000, 1280000, 1450000, 1380000],
+        "expenses": [720000, 840000, 780000, 920000, 1050000, 980000],
+        "customers": [1800, 2100, 1950, 2400, 2650, 2480],
+        "market_share": [0.08, 0.09, 0.085, 0.11, 0.12, 0.115],
+        "months": ["Jul", "Aug", "Sep", "Oct", "Nov", "Dec"],
+        "industry": "软件开发",
+        "company_size": "中小企业"
+    }
+    
+    # 保存演示数据
+    await app.file_ops.write_file("demo_business_data.json", json.dumps(demo_data, ensure_ascii=False, indent=2))
+    
+    # 两个案例互相独立，并发执行，结果返回后再按顺序输出
+    result1, result2 = await asyncio.gather(
+        app.analyze_business_performance("simulated_tech_company"),
+        app.analyze_business_performance("demo_business_data.json")
+    )
+    
     # 分析示例1: 使用模拟数据
     print("\n--- 分析案例1: 科技服务公司 ---")
-    result1 = await app.analyze_business_performance("simulated_tech_company")
     
     if result1["success"]:
         print(f"✅ 分析成功完成!")
@@ -515,26 +601,9 @@ async def main():
     else:
         print(f"❌ 分析失败: {result1['error']}")
     
-    # 创建演示数据文件进行第二次分析
+    # 分析示例2: 从文件读取数据
     print(f"\n--- 分析案例2: 从文件读取数据 ---")
     
-    demo_data = {
-        "company_name": "创新科技有限公司",
-        "revenue": [980000, 1120000, 1050000, 1280000, 1450000, 1380000],
-        "expenses": [720000, 840000, 780000, 920000, 1050000, 980000],
-        "customers": [1800, 2100, 1950, 2400, 2650, 2480],
-        "market_share": [0.08, 0.09, 0.085, 0.11, 0.12, 0.115],
-        "months": ["Jul", "Aug", "Sep", "Oct", "Nov", "Dec"],
-        "industry": "软件开发",
-        "company_size": "中小企业"
-    }
-    
-    # 保存演示数据
-    await app.file_ops.write_file("demo_business_data.json", json.dumps(demo_data, ensure_ascii=False, indent=2))
-    
-    # 从文件分析
-    result2 = await app.analyze_business_performance("demo_business_data.json")
-    
     if result2["success"]:
         print(f"✅ 文件数据分析完成!")
         print(f"📊 利润率: {result2['key_metrics'].get('profit_margin_percent', 'N/A')}%")
@@ -555,5 +624,21 @@ async def main():
     print(f"  • 用户自由: 完全控制应用逻辑和数据流")
     print(f"  • 可组合性: 轻松集成不同AI能力")
 
+async def main():
+    """创建应用实例并运行演示 - 展示框架的简洁性"""
+    
+    if aiohttp is None:
+        await run_demo(SmartBusinessAnalyzer("openai"))
+        return
+    
+    # 整个应用共享一个HTTP会话，多次抓取复用已建立的TCP/TLS连接和DNS缓存
+    connector = aiohttp.TCPConnector(limit=100, ttl_dns_cache=300)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        await run_demo(SmartBusinessAnalyzer("openai", http_session=session))
+
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    # uvloop.run 直接在uvloop事件循环上运行，无需设置已弃用的全局事件循环策略
+    if uvloop_run is not None:
+        uvloop_run(main())
+    else:
+        asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,17 @@
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+EXAMPLES_DIR = Path(__file__).resolve().parent.parent / "examples"
+
+
+@pytest.fixture
+def load_example():
+    """按目录名加载示例脚本 main.py 为模块（不执行 __main__ 部分）"""
+    def _load(name: str):
+        spec = importlib.util.spec_from_file_location(f"example_{name}", EXAMPLES_DIR / name / "main.py")
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+    return _load
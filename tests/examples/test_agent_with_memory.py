@@ -0,0 +1,86 @@
+import pytest
+
+
+@pytest.fixture
+def memory_module(load_example):
+    return load_example("012_agent_with_memory")
+
+
+class TestMemoryJournal:
+
+    async def test_replay_journal(self, memory_module, tmp_path):
+        """测试未达到合并阈值时只追加日志，加载时重放日志并重建索引"""
+        path = str(tmp_path / "memory.json")
+        memory = memory_module.SimpleMemory()
+        memory.add_long_term("city", "Shanghai", "profile")
+        memory.put_cached("k1", {"should_remember": False})
+        await memory.save_to_file(path)
+
+        assert not (tmp_path / "memory.json").exists()
+        assert len((tmp_path / "memory.json.log").read_text(encoding="utf-8").splitlines()) == 2
+
+        loaded = memory_module.SimpleMemory()
+        assert loaded.load_from_file(path) is True
+        assert loaded.long_term["profile"]["city"]["value"] == "Shanghai"
+        assert loaded.get_cached("k1") == {"should_remember": False}
+        assert [key for _, key, _ in loaded.search_long_term("shanghai")] == ["city"]
+
+    async def test_compaction_writes_snapshot(self, memory_module, tmp_path, monkeypatch):
+        """测试日志条数达到阈值时写快照并清空日志，之后的变更继续追加"""
+        monkeypatch.setattr(memory_module, "JOURNAL_COMPACT_EVERY", 3)
+        path = str(tmp_path / "memory.json")
+        memory = memory_module.SimpleMemory()
+        for i in range(3):
+            memory.add_long_term(f"k{i}", f"v{i}")
+        await memory.save_to_file(path)
+
+        assert (tmp_path / "memory.json").exists()
+        assert not (tmp_path / "memory.json.log").exists()
+
+        memory.add_long_term("k3", "v3")
+        await memory.save_to_file(path)
+        assert len((tmp_path / "memory.json.log").read_text(encoding="utf-8").splitlines()) == 1
+
+        loaded = memory_module.SimpleMemory()
+        loaded.load_from_file(path)
+        assert sorted(loaded.long_term["general"]) == ["k0", "k1", "k2", "k3"]
+
+    async def test_skips_truncated_line(self, memory_module, tmp_path):
+        """测试重放时跳过写入中断留下的残缺行"""
+        path = str(tmp_path / "memory.json")
+        memory = memory_module.SimpleMemory()
+        memory.add_long_term("lang", "python")
+        await memory.save_to_file(path)
+        with open(path + ".log", "ab") as f:
+            f.write(b'{"op": "put", "cat": "gen')
+
+        loaded = memory_module.SimpleMemory()
+        assert loaded.load_from_file(path) is True
+        assert list(loaded.long_term["general"]) == ["lang"]
+
+    def test_load_without_files(self, memory_module, tmp_path):
+        """测试没有快照和日志时返回False"""
+        assert memory_module.SimpleMemory().load_from_file(str(tmp_path / "none.json")) is False
+
+
+class TestCalcTrigger:
+
+    @pytest.mark.parametrize("text", [
+        "请帮我计算 1000 * 1.05 的 10次方",
+        "12+7等于多少",
+        "100 - 37 是多少",
+        "2^10",
+    ])
+    def test_triggers_on_expressions(self, memory_module, text):
+        """测试含有算式或"算"字的输入触发计算"""
+        assert memory_module._CALC_TRIGGER_RE.search(text) is not None
+
+    @pytest.mark.parametrize("text", [
+        "会议定在2025-10-15",
+        "这个项目需要3-5人",
+        "我的电话是010-12345678",
+        "你好，我叫小明，今年25岁",
+    ])
+    def test_ignores_dates_and_ranges(self, memory_module, text):
+        """测试日期、范围和编号中的连字符不触发计算"""
+        assert memory_module._CALC_TRIGGER_RE.search(text) is None
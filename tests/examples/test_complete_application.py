@@ -0,0 +1,41 @@
+import pytest
+
+
+@pytest.fixture
+def analyzer(load_example, monkeypatch):
+    module = load_example("020_complete_application")
+    monkeypatch.setattr(module, "create_llm", lambda *args, **kwargs: None)
+    monkeypatch.setattr(module, "WebClient", lambda *args, **kwargs: None)
+    return module.SmartBusinessAnalyzer()
+
+
+class TestFinancialMetrics:
+
+    async def test_metrics(self, analyzer):
+        """测试利润、合计与客户指标（整数输入保持整数）"""
+        data = {
+            "revenue": (1200, 1350, 1180),
+            "expenses": (800, 900, 850),
+            "customers": (100, 120, 140),
+        }
+        metrics = await analyzer._calculate_financial_metrics({"data": data})
+
+        assert metrics["total_revenue"] == 3730 and isinstance(metrics["total_revenue"], int)
+        assert metrics["total_expenses"] == 2550
+        assert metrics["monthly_profits"] == [400, 450, 330]
+        assert metrics["average_monthly_revenue"] == round(3730 / 3, 2)
+        assert metrics["profit_margin_percent"] == round((3730 - 2550) / 3730 * 100, 2)
+        assert metrics["average_customers"] == 120
+        assert metrics["customer_growth_percent"] == 40.0
+
+    async def test_uneven_series(self, analyzer):
+        """测试收入与支出长度不同时，利润按较短的序列计算"""
+        data = {"revenue": [1.5, 2.5], "expenses": [1.0, 1.0, 3.0]}
+        metrics = await analyzer._calculate_financial_metrics({"data": data})
+
+        assert metrics["monthly_profits"] == [0.5, 1.5]
+        assert metrics["total_expenses"] == 5.0
+
+    async def test_missing_data(self, analyzer):
+        """测试没有数据时返回错误"""
+        assert "error" in await analyzer._calculate_financial_metrics({})
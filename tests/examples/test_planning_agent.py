@@ -0,0 +1,45 @@
+import pytest
+
+
+@pytest.fixture
+def planning_module(load_example):
+    return load_example("013_planning_agent")
+
+
+class TestTaskPlanDict:
+
+    def test_reflects_mutations(self, planning_module):
+        """测试通过方法和属性赋值修改后，to_dict 不返回过期的缓存"""
+        plan = planning_module.TaskPlan("main", "d")
+        subtask = planning_module.TaskPlan("sub", "d")
+        plan.add_subtask(subtask)
+        plan.to_dict()
+
+        plan.estimated_time = 600
+        plan.set_metadata("plan_id", "p1")
+        subtask.add_dependency("other")
+        subtask.start()
+
+        result = plan.to_dict()
+        assert result["estimated_time"] == 600
+        assert result["metadata"] == {"plan_id": "p1"}
+        assert result["subtasks"][0]["dependencies"] == ["other"]
+        assert result["subtasks"][0]["status"] == "in_progress"
+
+    def test_fields_read_only(self, planning_module):
+        """测试 dependencies、subtasks、metadata 不能绕过方法直接修改"""
+        plan = planning_module.TaskPlan("main", "d")
+
+        with pytest.raises(AttributeError):
+            plan.dependencies.append("other")
+        with pytest.raises(AttributeError):
+            plan.subtasks.append(plan)
+        with pytest.raises(TypeError):
+            plan.metadata["plan_id"] = "p1"
+
+    def test_returns_copy(self, planning_module):
+        """测试修改返回的字典不影响缓存"""
+        plan = planning_module.TaskPlan("main", "d")
+        plan.to_dict()["status"] = "completed"
+
+        assert plan.to_dict()["status"] == "pending"
@@ -0,0 +1,49 @@
+from ai_modular_blocks.tools import FileOperations
+
+
+class TestWriteFile:
+
+    async def test_write_str(self, tmp_path):
+        """测试写入文本（按编码统计字节数）"""
+        path = tmp_path / "note.txt"
+        result = await FileOperations().write_file(str(path), "你好, world")
+
+        assert result["success"] is True
+        assert result["bytes_written"] == len("你好, world".encode("utf-8"))
+        assert path.read_text(encoding="utf-8") == "你好, world"
+
+    async def test_write_bytes(self, tmp_path):
+        """测试直接写入已编码的字节串"""
+        path = tmp_path / "report.json"
+        data = '{"名称": 1}'.encode("utf-8")
+        result = await FileOperations().write_file(str(path), data)
+
+        assert result["success"] is True
+        assert result["bytes_written"] == len(data)
+        assert path.read_bytes() == data
+
+    async def test_creates_nested_dirs(self, tmp_path):
+        """测试自动创建多级父目录"""
+        path = tmp_path / "a" / "b" / "c" / "out.txt"
+        result = await FileOperations().write_file(str(path), "x")
+
+        assert result["success"] is True
+        assert path.read_text() == "x"
+
+    async def test_existing_dir(self, tmp_path):
+        """测试父目录已存在时仍可重复写入"""
+        file_ops = FileOperations()
+        path = tmp_path / "out.txt"
+
+        assert (await file_ops.write_file(str(path), "first"))["success"] is True
+        assert (await file_ops.write_file(str(path), "second"))["success"] is True
+        assert path.read_text() == "second"
+
+    async def test_missing_dir_without_create_dirs(self, tmp_path):
+        """测试关闭 create_dirs 时父目录不存在返回失败"""
+        path = tmp_path / "missing" / "out.txt"
+        result = await FileOperations().write_file(str(path), "x", create_dirs=False)
+
+        assert result["success"] is False
+        assert "error" in result
+        assert not path.exists()
@@ -0,0 +1,97 @@
+from types import SimpleNamespace
+
+import pytest
+
+from ai_modular_blocks.tools import web_client
+from ai_modular_blocks.tools.web_client import WebClient
+
+
+class FakeResponse:
+    status = 200
+    headers = {"Content-Type": "application/json"}
+    url = "https://example.com/api"
+
+    async def text(self):
+        return '{"ok": true}'
+
+    async def json(self):
+        return {"ok": True}
+
+
+class FakeRequest:
+    async def __aenter__(self):
+        return FakeResponse()
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+class FakeSession:
+    """会话替身：记录请求，close() 只应由会话的持有者调用"""
+
+    opened = 0
+
+    def __init__(self, **kwargs):
+        FakeSession.opened += 1
+        self.requests = []
+        self.closed = False
+
+    def request(self, method, url, **kwargs):
+        self.requests.append((method, url, kwargs))
+        return FakeRequest()
+
+    async def close(self):
+        self.closed = True
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+        return False
+
+
+@pytest.fixture(autouse=True)
+def fake_aiohttp(monkeypatch):
+    """用替身替换 aiohttp，未安装 aiohttp 时同样可以运行"""
+    FakeSession.opened = 0
+    monkeypatch.setattr(web_client, "AIOHTTP_AVAILABLE", True)
+    monkeypatch.setattr(
+        web_client,
+        "aiohttp",
+        SimpleNamespace(ClientTimeout=lambda total: total, ClientSession=FakeSession),
+        raising=False,
+    )
+
+
+class TestWebClientSharedSession:
+
+    async def test_requests_use_given_session(self):
+        """测试传入的会话被所有请求复用，不再另开会话"""
+        session = FakeSession()
+        client = WebClient(session=session)
+
+        first = await client.get("https://example.com/api")
+        second = await client.post("https://example.com/api", data={"q": 1})
+
+        assert FakeSession.opened == 1
+        assert [method for method, _, _ in session.requests] == ["GET", "POST"]
+        assert session.requests[1][2]["json"] == {"q": 1}
+        assert first["success"] is True and first["data"] == {"ok": True}
+        assert second["status_code"] == 200
+
+    async def test_session_left_open(self):
+        """测试客户端不关闭调用方持有的会话"""
+        session = FakeSession()
+        await WebClient(session=session).fetch("https://example.com/api")
+
+        assert session.closed is False
+
+    async def test_session_per_request_without_shared(self):
+        """测试未传入会话时每个请求各自打开会话"""
+        client = WebClient()
+
+        await client.get("https://example.com/api")
+        await client.get("https://example.com/api")
+
+        assert FakeSession.opened == 2
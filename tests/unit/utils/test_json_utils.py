@@ -0,0 +1,26 @@
+import pytest
+
+from ai_modular_blocks.utils import parse_llm_json, strip_code_fence
+
+
+class TestParseLLMJson:
+
+    @pytest.mark.parametrize("content", [
+        '{"a": 1}',
+        '```json\n{"a": 1}\n```',
+        '```\n{"a": 1}\n```',
+        '  ```json{"a": 1}',  # 流式截断时缺少结尾标记
+    ])
+    def test_parses_object(self, content):
+        """测试解析裸JSON及代码块包裹的JSON"""
+        assert parse_llm_json(content) == {"a": 1}
+
+    @pytest.mark.parametrize("content", ["not json", "[1, 2]", '"text"', ""])
+    def test_returns_default(self, content):
+        """测试无法解析或不是对象时返回default"""
+        assert parse_llm_json(content) is None
+        assert parse_llm_json(content, {}) == {}
+
+    def test_strip_code_fence_without_fence(self):
+        """测试没有代码块时只去掉首尾空白"""
+        assert strip_code_fence('  {"a": 1}\n') == '{"a": 1}'